@@ -21,6 +21,14 @@ app.conf.beat_schedule = {
         'task': 'users.tasks.deactivate_inactive_users',  # Путь к задаче
         'schedule': crontab(minute=0, hour=0),  # Выполняется каждый день в полночь
     },
+    'refresh-currency-rate': {
+        'task': 'materials.tasks.refresh_currency_rate',
+        'schedule': crontab(minute='*/30'),  # Обновление курса RUB -> USD каждые 30 минут
+    },
+    'refresh-payment-rollups': {
+        'task': 'users.tasks.refresh_payment_rollups',
+        'schedule': crontab(minute='*/15'),  # Инкрементальное обновление сводной таблицы выручки
+    },
 }
 
 app.conf.timezone = 'UTC'
@@ -10,9 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -28,6 +30,9 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG') == '1'
 
+# Запуск тестов (manage.py test)
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS' , '').split(',')
 
 # Application definition
@@ -48,6 +53,12 @@ INSTALLED_APPS = [
     'django_celery_beat',
 ]
 
+# Нагрузочное тестирование (команда load_test и заглушки внешних сервисов): подменяет Stripe
+# и переключает Celery в синхронный режим, поэтому в продакшене не подключается
+LOADTEST_ENABLED = DEBUG or TESTING or os.getenv('LOADTEST_ENABLED') == '1'
+if LOADTEST_ENABLED:
+    INSTALLED_APPS.append('loadtest')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -165,9 +176,73 @@ CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',')
 CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', '').split(',')
 
 CUR_API_URL = 'https://api.currencyapi.com/'
+CUR_API_KEY = os.getenv('CUR_API_KEY')
+CUR_API_TIMEOUT = 5
+# Курс валют считается свежим CUR_RATE_TTL секунд, после чего обновляется в фоне,
+# а устаревшее значение отдается еще до CUR_RATE_STALE_TTL секунд
+CUR_RATE_TTL = 60 * 60
+CUR_RATE_STALE_TTL = 60 * 60 * 24
 # CUR_API_KEY = 'sk_test_51QrFU62NEaiL6YkGr6CGQ1T2Ojt2taSEbRnpZpdKo0NILw4GCwdKnuL2QhuxULJeKwDJCINDQc8SEuFdv4SXDuDW00uSWgXdsp'
 
 STRIPE_API_KEY = os.getenv('STRIPE_API_KEY')
+# HTTP-клиент Stripe: таймауты (сек.), повторы с экспоненциальной задержкой и размер пула соединений
+STRIPE_CONNECT_TIMEOUT = 3
+STRIPE_READ_TIMEOUT = 10
+STRIPE_MAX_RETRIES = 2
+STRIPE_RETRY_BACKOFF = 0.5
+STRIPE_HTTP_POOL_SIZE = 10
+# Создавать сессию оплаты в фоне (Celery): API сразу возвращает платеж в статусе pending
+PAYMENT_ASYNC_CHECKOUT = os.getenv('PAYMENT_ASYNC_CHECKOUT') == '1'
+# Повторы задачи создания сессии при ошибках Stripe (с экспоненциальной задержкой)
+PAYMENT_SESSION_MAX_RETRIES = 5
+
+# Кэш: общий для веб-процессов и воркеров Celery Redis. Адрес берется из CACHE_LOCATION,
+# иначе строится из REDIS_HOST/REDIS_PORT или берется CELERY_BROKER_URL.
+# Память процесса допускается только в тестах и при DEBUG: ее не видят другие процессы
+# (курс валют из beat-задачи, отметки отложенных рассылок)
+REDIS_HOST = os.getenv('REDIS_HOST')
+REDIS_PORT = os.getenv('REDIS_PORT', '6379')
+CACHE_LOCATION = (
+    os.getenv('CACHE_LOCATION')
+    or (f'redis://{REDIS_HOST}:{REDIS_PORT}/1' if REDIS_HOST else os.getenv('CELERY_BROKER_URL'))
+)
+if CACHE_LOCATION and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+elif DEBUG or TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured('Не задан адрес Redis для кэша: укажите REDIS_HOST или CACHE_LOCATION')
+
+# Пользователи, не заходившие в систему дольше этого срока, деактивируются
+USER_INACTIVITY_PERIOD = timedelta(days=30)
+USER_DEACTIVATION_BATCH_SIZE = 1000
+
+# Сводная таблица выручки: каждый запуск пересчитывает дни платежей, измененных после (отметка - лаг);
+# пересборка выполняется частями по PAYMENT_ROLLUP_CHUNK_DAYS дней
+PAYMENT_ROLLUP_LAG = timedelta(hours=1)
+PAYMENT_ROLLUP_CHUNK_DAYS = 7
+
+# Потоковые выгрузки: строк в одной выборке серверного курсора и в одном блоке ответа
+EXPORT_CHUNK_SIZE = 2000
+
+# Время жизни закэшированных ответов списка и карточек курсов (сек.)
+COURSE_CACHE_TTL = 60 * 5
+
+# Видеохостинги, ссылки на которые принимаются в описании урока (см. materials.validators.VIDEO_HOSTS)
+ALLOWED_VIDEO_HOSTS = ['youtube.com', 'youtu.be']
+
+# Массовый импорт уроков: максимум уроков в одном запросе и размер пачки INSERT
+LESSON_BULK_MAX_ITEMS = 500
+LESSON_BULK_BATCH_SIZE = 100
 
 # Настройки Redis (брокера)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
@@ -189,3 +264,12 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 # Настройки для отправки почты через SMTP
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Размер пачки подписчиков при рассылке об обновлении курса
+COURSE_UPDATE_EMAIL_CHUNK_SIZE = 500
+# Параллельная рассылка: минимальный размер диапазона id подписок на одну задачу
+# и максимальное количество одновременно запускаемых задач
+COURSE_UPDATE_FANOUT_CHUNK_SIZE = 5000
+COURSE_UPDATE_FANOUT_CONCURRENCY = 8
+# Окно (в секундах), в течение которого обновления курса объединяются в одну рассылку
+COURSE_UPDATE_EMAIL_DEBOUNCE = 60
@@ -0,0 +1,35 @@
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+
+class FakeStripeClient:
+    """
+    Локальная замена StripeClient: возвращает фиктивные объекты и запоминает вызовы.
+
+    Используется в тестах и в нагрузочном тесте (`load_test`), чтобы работать без сети;
+    `latency` имитирует время ответа Stripe в секундах.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.calls = Counter()
+        self.options = {}
+        self._lock = threading.Lock()
+        self.v1 = SimpleNamespace(
+            products=SimpleNamespace(create=self._create('prod')),
+            prices=SimpleNamespace(create=self._create('price')),
+            checkout=SimpleNamespace(sessions=SimpleNamespace(create=self._create('cs'))),
+        )
+
+    def _create(self, prefix):
+        def create(params=None, options=None):
+            if self.latency:
+                time.sleep(self.latency)
+            with self._lock:
+                self.calls[prefix] += 1
+                self.options[prefix] = options or {}
+                object_id = f'{prefix}_{self.calls[prefix]}'
+            return SimpleNamespace(id=object_id, url=f'https://checkout.stripe.test/{object_id}')
+        return create
@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from config import celery_app
+from loadtest.fakes import FakeStripeClient
+from materials.models import Course
+from materials.services import refresh_rate
+from users.models import User
+from users.services import StripeService
+
+# Сценарий: (вес, метод, функция адреса, функция данных)
+SCENARIOS = {
+    'course-list': (30, 'get', lambda data: f'/course/?page_size={data.random.randint(5, 10)}', None),
+    'course-detail': (25, 'get', lambda data: f'/course/{data.course()}/', None),
+    'lesson-list': (10, 'get', lambda data: '/lesson/list/', None),
+    'subscribe': (15, 'post', lambda data: f'/subscription/subscribe/{data.course()}/', None),
+    'subscribe-bulk': (5, 'post', lambda data: '/subscription/subscribe/bulk/',
+                       lambda data: {'courses': [data.course() for _ in range(5)]}),
+    'payment-create': (5, 'post', lambda data: '/users/payment/',
+                       lambda data: {'pay_course': data.course(), 'payment_method': 'transfer'}),
+    'payment-list': (10, 'get', lambda data: '/users/api/payments_details/?limit=20', None),
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест API материалов, подписок и платежей внутри процесса: '
+            'пропускная способность, перцентили задержки и количество SQL-запросов на запрос. '
+            'Stripe и курс валют подменяются локальными заглушками. '
+            'Внимание: запросы создают подписки и платежи в текущей базе данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Общее количество запросов')
+        parser.add_argument('--concurrency', type=int, default=4, help='Количество параллельных потоков')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Сценарии через запятую: {", ".join(SCENARIOS)}')
+        parser.add_argument('--users', type=int, default=100, help='Из скольких пользователей выбираются клиенты')
+        parser.add_argument('--stripe-latency', type=float, default=0, help='Задержка заглушки Stripe (сек.)')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--yes', action='store_true',
+                            help='Подтвердить запись в базу, если DEBUG выключен')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['yes']:
+            # Откатить изменения нельзя: потоки работают в отдельных соединениях
+            raise CommandError(
+                f'Нагрузочный тест создает и удаляет подписки и создает платежи в базе '
+                f'"{settings.DATABASES["default"]["NAME"]}". Запустите его с DEBUG=1 на тестовой базе '
+                f'или подтвердите флагом --yes'
+            )
+
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+
+        rng = random.Random(options['seed'])
+        users = list(User.objects.filter(is_active=True).order_by('id')[:options['users']])
+        course_ids = list(Course.objects.values_list('id', flat=True)[:10000])
+        if not users or not course_ids:
+            raise CommandError('Нет пользователей или курсов, сначала выполните generate_synthetic_data')
+
+        weights = [SCENARIOS[name][0] for name in names]
+        plan = [(rng.choice(users), rng.choices(names, weights)[0]) for _ in range(options['requests'])]
+        data = SimpleNamespace(random=rng, course=lambda: rng.choice(course_ids))
+        # Адреса и данные готовятся заранее, чтобы генерация не попадала в замеры
+        plan = [
+            (user, name, method, url(data), payload and payload(data))
+            for user, name in plan
+            for _, method, url, payload in [SCENARIOS[name]]
+        ]
+
+        results = defaultdict(list)
+        lock = threading.Lock()
+        chunks = [plan[index::options['concurrency']] for index in range(options['concurrency'])]
+
+        def worker(requests, close_connection):
+            client = APIClient()
+            try:
+                for user, name, method, url, payload in requests:
+                    client.force_authenticate(user=user)
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        try:
+                            status_code = getattr(client, method)(url, payload, format='json').status_code
+                        except Exception:  # Ошибка сервера не должна останавливать тест
+                            status_code = 'exception'
+                        latency = time.perf_counter() - started
+                    with lock:
+                        results[name].append((latency, status_code, len(queries)))
+            finally:
+                if close_connection:
+                    connection.close()
+
+        # Хост тестового клиента, почта в памяти и задачи Celery в процессе: без внешних сервисов
+        test_environment = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        test_environment.enable()
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        refresh_rate('RUB', 'USD', client=SimpleNamespace(get_rate=lambda base, target: 0.011))
+        stripe_service = StripeService(client=FakeStripeClient(latency=options['stripe_latency']))
+        try:
+            with mock.patch('users.services.get_stripe_service', return_value=stripe_service):
+                started = time.perf_counter()
+                if options['concurrency'] == 1:
+                    worker(chunks[0], close_connection=False)
+                else:
+                    threads = [threading.Thread(target=worker, args=(chunk, True)) for chunk in chunks]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                elapsed = time.perf_counter() - started
+        finally:
+            celery_app.conf.task_always_eager = eager
+            test_environment.disable()
+
+        self.report(results, elapsed, options)
+
+    def report(self, results, elapsed, options):
+        total = sum(len(rows) for rows in results.values())
+        self.stdout.write(
+            f'Запросов: {total}, потоков: {options["concurrency"]}, время: {elapsed:.2f} с, '
+            f'пропускная способность: {total / elapsed:.1f} запр./с'
+        )
+        self.stdout.write(f'{"сценарий":<16}{"запросов":>9}{"ошибок":>8}{"p50 мс":>9}{"p90 мс":>9}'
+                          f'{"p99 мс":>9}{"SQL/запр.":>11}  коды ошибок')
+        for name, rows in sorted(results.items()):
+            latencies = [latency * 1000 for latency, _, _ in rows]
+            # Ошибкой считается любой ответ не 2xx (в том числе 4xx) и исключение
+            errors = Counter(str(code) for _, code, _ in rows if code == 'exception' or not 200 <= code < 300)
+            queries = sum(count for _, _, count in rows) / len(rows)
+            codes = ' '.join(f'{code}:{count}' for code, count in sorted(errors.items()))
+            self.stdout.write(
+                f'{name:<16}{len(rows):>9}{sum(errors.values()):>8}{percentile(latencies, 0.5):>9.1f}'
+                f'{percentile(latencies, 0.9):>9.1f}{percentile(latencies, 0.99):>9.1f}{queries:>11.1f}  {codes}'.rstrip()
+            )
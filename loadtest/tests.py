@@ -0,0 +1,29 @@
+import io
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+
+class LoadTestCommandTestCase(TestCase):
+    def setUp(self):
+        call_command('generate_synthetic_data', users=30, courses=5, lessons_per_course=3, subscriptions=40,
+                     payments=50, seed=1, batch_size=10, stdout=io.StringIO())
+
+    def test_load_test(self):
+        """Нагрузочный тест работает без сети и выводит перцентили и количество запросов к базе"""
+        out = io.StringIO()
+
+        call_command('load_test', requests=40, concurrency=1, seed=1, yes=True, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Запросов: 40, потоков: 1', output)
+        self.assertIn('p99 мс', output)
+        rows = [line.split() for line in output.splitlines()[2:]]
+        self.assertTrue(rows)
+        # Колонка ошибок (все ответы не 2xx и исключения)
+        self.assertEqual({row[2] for row in rows}, {'0'})
+
+    def test_requires_confirmation(self):
+        """Без DEBUG команда не пишет в базу без флага --yes"""
+        with self.assertRaises(CommandError):
+            call_command('load_test', requests=1, stdout=io.StringIO())
@@ -0,0 +1,93 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from subscription.models import Subscription
+
+# Версия общих данных курсов (поля курсов, уроки, счетчики): меняется при любом изменении
+COURSES_VERSION_KEY = 'materials:courses:version'
+# Версия уроков (поля уроков, состав): меняется при изменении, создании и удалении уроков
+LESSONS_VERSION_KEY = 'materials:lessons:version'
+# Версия подписок пользователя: меняется при подписке/отписке
+SUBSCRIPTIONS_VERSION_KEY = 'materials:subscriptions:{user_id}:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Новое значение не должно совпасть с версией, под которой данные могли быть закэшированы ранее
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_courses():
+    """Сбрасывает закэшированные списки и карточки курсов"""
+    bump_version(COURSES_VERSION_KEY)
+
+
+def invalidate_lessons():
+    """Меняет версию уроков (валидатор ETag списка уроков)"""
+    bump_version(LESSONS_VERSION_KEY)
+
+
+def invalidate_user_subscriptions(user_id):
+    """Сбрасывает закэшированный список подписок пользователя"""
+    bump_version(SUBSCRIPTIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def course_list_key(request, usd_rate):
+    # Курс валют входит в ключ: от него зависит usd_price в закэшированном списке
+    query = hashlib.md5(f'{request.build_absolute_uri()}|{usd_rate}'.encode()).hexdigest()
+    return f'materials:courses:list:v{get_version(COURSES_VERSION_KEY)}:{query}'
+
+
+def course_detail_key(course_id):
+    return f'materials:courses:detail:{course_id}:v{get_version(COURSES_VERSION_KEY)}'
+
+
+def subscribed_course_ids(user):
+    """Множество id курсов, на которые подписан пользователь (из кэша или одним запросом)"""
+    version = get_version(SUBSCRIPTIONS_VERSION_KEY.format(user_id=user.pk))
+    key = f'materials:subscriptions:{user.pk}:v{version}'
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = set(Subscription.objects.filter(user=user).values_list('course_id', flat=True))
+        cache.set(key, course_ids, settings.COURSE_CACHE_TTL)
+    return course_ids
+
+
+def _shared_course(course):
+    # Поле подписки остается на своем месте в ответе, но не хранится в общем кэше
+    return {key: None if key == 'is_subscribed' else value for key, value in course.items()}
+
+
+def _user_course(course, course_ids):
+    return {**course, 'is_subscribed': course['id'] in course_ids}
+
+
+def store_course_list(key, data):
+    cache.set(key, {**data, 'results': [_shared_course(course) for course in data['results']]},
+              settings.COURSE_CACHE_TTL)
+
+
+def store_course_detail(key, data):
+    cache.set(key, _shared_course(data), settings.COURSE_CACHE_TTL)
+
+
+def user_course_list(data, user):
+    course_ids = subscribed_course_ids(user)
+    return {**data, 'results': [_user_course(course, course_ids) for course in data['results']]}
+
+
+def user_course_detail(data, user):
+    return _user_course(data, subscribed_course_ids(user))
@@ -0,0 +1,56 @@
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from materials.validators import DescriptionValidator, get_video_link_extractor
+
+FILLER = 'Разбираем модели, миграции и запросы Django на примерах. '
+
+
+def legacy_validate(value):
+    """Прежняя проверка: регулярное выражение компилируется при каждом вызове"""
+    youtube_pattern = re.compile(r"https?://(www\.)?(youtube\.com|youtu\.be)/\S+")
+    return youtube_pattern.search(value) is not None
+
+
+def build_descriptions(size):
+    """Описания размером около `size` символов: без ссылки, со ссылкой в конце и с десятью ссылками"""
+    text = FILLER * (size // len(FILLER) + 1)
+    text = text[:size]
+    links = ' '.join(f'https://www.youtube.com/watch?v=dQw4w9WgX{number:02d}' for number in range(10))
+    return {
+        'без ссылки': text,
+        'ссылка в конце': f'{text} https://youtu.be/dQw4w9WgXcQ',
+        '10 ссылок': f'{links} {text}',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость проверки описаний уроков до и после предкомпиляции регулярных выражений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000',
+                            help='Размеры описаний в символах через запятую')
+        parser.add_argument('--number', type=int, default=20, help='Количество вызовов в одном замере')
+
+    def handle(self, *args, **options):
+        validator = DescriptionValidator(field='description')
+        extractor = get_video_link_extractor()
+        number = options['number']
+
+        for size in (int(size) for size in options['sizes'].split(',')):
+            for name, description in build_descriptions(size).items():
+                timings = {
+                    'прежняя проверка': lambda: legacy_validate(description),
+                    'has_link': lambda: extractor.has_link(description),
+                    'extract_video_ids': lambda: extractor.extract_video_ids(description),
+                }
+                if extractor.has_link(description):
+                    timings['DescriptionValidator'] = lambda: validator(description)
+
+                self.stdout.write(f'{size} символов, {name}:')
+                for label, func in timings.items():
+                    # Лучший из трех замеров, в микросекундах на вызов
+                    best = min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+                    self.stdout.write(f'    {label:<22} {best:>12.1f} мкс')
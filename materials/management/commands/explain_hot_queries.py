@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from materials.models import Lesson
+from subscription.models import Subscription
+from users.models import Payment
+
+User = get_user_model()
+
+
+def hot_queries():
+    """Запросы с горячих путей API и фоновых задач (параметры подставляются условные)"""
+    return [
+        ('Уроки владельца', Lesson.objects.filter(owner_id=1).order_by('id')),
+        ('История платежей пользователя', Payment.objects.filter(user_id=1).order_by('-data_pay', '-id')),
+        ('Платежи пользователя по курсу', Payment.objects.filter(user_id=1, pay_course_id=1)),
+        ('Платежи пользователя за период', Payment.objects.filter(
+            user_id=1, data_pay__range=(timezone.now(), timezone.now())).order_by('-data_pay', '-id')),
+        ('Платежи пользователя по сумме', Payment.objects.filter(user_id=1, amount__range=(100, 1000))),
+        ('Подписчики курса', Subscription.objects.filter(course_id=1).values_list('id', 'user__email')),
+        ('Неактивные пользователи', User.objects.filter(last_login__lte=timezone.now(), is_active=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Выполняет EXPLAIN для горячих запросов и показывает, используют ли они индексы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help='Выводить план запроса целиком')
+
+    def handle(self, *args, **options):
+        without_index = 0
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            # PostgreSQL: Index Scan / Index Only Scan / Bitmap Index Scan; SQLite: USING (COVERING) INDEX
+            uses_index = 'index' in plan.lower()
+            without_index += not uses_index
+
+            status = self.style.SUCCESS('индекс') if uses_index else self.style.WARNING('без индекса')
+            self.stdout.write(f'{name}: {status}')
+            if options['verbose_plan'] or not uses_index:
+                self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+
+        if without_index:
+            self.stdout.write(self.style.WARNING(
+                f'Запросов без индекса: {without_index}. На маленьких таблицах планировщик '
+                f'может предпочесть последовательное чтение, проверяйте на реальном объеме данных.'
+            ))
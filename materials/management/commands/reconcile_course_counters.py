@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from materials.models import Course, Lesson
+from subscription.models import Subscription
+
+
+def actual_count(model):
+    """Подзапрос с фактическим количеством строк `model` для курса"""
+    rows = model.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(total=Count('pk'))
+    return Coalesce(Subquery(rows.values('total')), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики уроков и подписчиков курсов, исправляя расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество курсов в одном UPDATE')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = Course.objects.aggregate(last=Max('id'))['last'] or 0
+
+        fixed = 0
+        for start in range(0, last_id, batch_size):
+            batch = Course.objects.filter(id__gt=start, id__lte=start + batch_size)
+            drifted = batch.annotate(
+                actual_lessons=actual_count(Lesson),
+                actual_subscribers=actual_count(Subscription),
+            ).exclude(lesson_count=F('actual_lessons'), subscriber_count=F('actual_subscribers'))
+
+            with transaction.atomic():
+                fixed += Course.objects.filter(pk__in=drifted.values('pk')).update(
+                    lesson_count=actual_count(Lesson),
+                    subscriber_count=actual_count(Subscription),
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Исправлено курсов: {fixed}'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0006_course_last_updated_course_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='stripe_price_amount',
+            field=models.IntegerField(blank=True, help_text='Цена, для которой создан stripe_price_id', null=True, verbose_name='Цена в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='stripe_price_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='ID цены в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='stripe_product_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='ID продукта в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='stripe_price_amount',
+            field=models.IntegerField(blank=True, help_text='Цена, для которой создан stripe_price_id', null=True, verbose_name='Цена в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='stripe_price_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='ID цены в Stripe'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='stripe_product_id',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='ID продукта в Stripe'),
+        ),
+    ]
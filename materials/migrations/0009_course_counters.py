@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_course_counters(apps, schema_editor):
+    Course = apps.get_model('materials', 'Course')
+    Lesson = apps.get_model('materials', 'Lesson')
+    Subscription = apps.get_model('subscription', 'Subscription')
+
+    def count_of(model):
+        rows = model.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(total=Count('pk'))
+        return Coalesce(Subquery(rows.values('total')), 0)
+
+    Course.objects.update(lesson_count=count_of(Lesson), subscriber_count=count_of(Subscription))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0008_hot_path_indexes'),
+        ('subscription', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество уроков'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='subscriber_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(fill_course_counters, migrations.RunPython.noop),
+    ]
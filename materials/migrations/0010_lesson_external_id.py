@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0009_course_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Ключ урока во внешней системе, по нему повторный импорт обновляет урок.', max_length=255, null=True, verbose_name='Внешний ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'external_id'), name='lesson_course_external_id_uniq'),
+        ),
+    ]
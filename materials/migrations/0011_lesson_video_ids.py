@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:15
+
+import re
+
+from django.db import migrations, models
+
+# Копия materials.validators на момент миграции (хосты youtube.com и youtu.be):
+# изменения валидатора не должны менять результат уже написанной миграции
+VIDEO_PATTERN = re.compile(
+    r'https?://(?:www\.|m\.|player\.)?'
+    r'(?:youtube\.com/(?:watch\?(?:[^\s&#]*&)*v=|embed/|shorts/|live/)([\w-]{11})|youtu\.be/([\w-]{11}))'
+)
+
+
+def extract_video_ids(text):
+    return list(dict.fromkeys(match.group(match.lastindex) for match in VIDEO_PATTERN.finditer(text)))
+
+
+def fill_video_ids(apps, schema_editor):
+    Lesson = apps.get_model('materials', 'Lesson')
+    batch = []
+    for lesson in Lesson.objects.exclude(description=None).only('id', 'description').iterator(chunk_size=1000):
+        lesson.video_ids = extract_video_ids(lesson.description)
+        if lesson.video_ids:
+            batch.append(lesson)
+        if len(batch) >= 1000:
+            Lesson.objects.bulk_update(batch, ['video_ids'])
+            batch = []
+    Lesson.objects.bulk_update(batch, ['video_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0010_lesson_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='video_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Идентификаторы видео из ссылок в описании.', verbose_name='ID видео'),
+        ),
+        migrations.RunPython(fill_video_ids, migrations.RunPython.noop),
+    ]
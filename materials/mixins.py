@@ -0,0 +1,36 @@
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы: заголовки `ETag` и `Last-Modified` и ответ 304 без сериализации,
+    если у клиента актуальная версия (`If-None-Match` / `If-Modified-Since`).
+    """
+    etag = None
+    last_modified = None
+
+    def conditional_response(self, request, last_modified, *etag_parts):
+        """
+        Запоминает валидаторы для ответа и возвращает 304, если данные клиента не изменились
+        (иначе None).
+
+        `last_modified` передается, только если время изменения строк ответа меняется при любом
+        изменении ответа: для валидаторов по версиям кэша (подписки, счетчики, удаление строк
+        не меняют даты) передается None, и 304 отдается только по совпадению ETag.
+        """
+        key = '|'.join(str(part) for part in (request.get_full_path(), *etag_parts, last_modified))
+        self.etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        self.last_modified = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+        return get_conditional_response(request._request, etag=self.etag, last_modified=self.last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
@@ -2,6 +2,7 @@ from django.db import models
 
 from config import settings
 from config.settings import NULLABLE
+from materials.validators import get_video_link_extractor
 
 
 class Course(models.Model):
@@ -37,9 +38,50 @@ class Course(models.Model):
 
     last_updated_course = models.DateTimeField(auto_now=True, verbose_name='дата Последнего обновление')
 
+    # Счетчики поддерживаются сигналами (materials.signals, subscription.signals)
+    lesson_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество уроков'
+    )
+    subscriber_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+
+    # Продукт и цена в Stripe, переиспользуются между оплатами
+    stripe_product_id = models.CharField(
+        max_length=255,
+        verbose_name='ID продукта в Stripe',
+        **NULLABLE
+    )
+    stripe_price_id = models.CharField(
+        max_length=255,
+        verbose_name='ID цены в Stripe',
+        **NULLABLE
+    )
+    stripe_price_amount = models.IntegerField(
+        verbose_name='Цена в Stripe',
+        help_text='Цена, для которой создан stripe_price_id',
+        **NULLABLE
+    )
+
+    COUNTER_FIELDS = ('lesson_count', 'subscriber_count')
+
     def __str__(self):
         return f'{self.name}'
 
+    def save(self, *args, **kwargs):
+        """
+        При обновлении существующего курса счетчики не перезаписываются значениями из памяти:
+        они изменяются только атомарными UPDATE через F-выражения.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Курс'
         verbose_name_plural = 'Курсы'
@@ -84,9 +126,57 @@ class Lesson(models.Model):
 
     last_updated_lesson = models.DateTimeField(auto_now=True, verbose_name='дата Последнего обновление')
 
+    external_id = models.CharField(
+        max_length=255,
+        verbose_name='Внешний ID',
+        help_text='Ключ урока во внешней системе, по нему повторный импорт обновляет урок.',
+        **NULLABLE
+    )
+
+    # Заполняется при сохранении, чтобы не сканировать описание повторно
+    video_ids = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='ID видео',
+        help_text='Идентификаторы видео из ссылок в описании.'
+    )
+
+    # Продукт и цена в Stripe, переиспользуются между оплатами
+    stripe_product_id = models.CharField(
+        max_length=255,
+        verbose_name='ID продукта в Stripe',
+        **NULLABLE
+    )
+    stripe_price_id = models.CharField(
+        max_length=255,
+        verbose_name='ID цены в Stripe',
+        **NULLABLE
+    )
+    stripe_price_amount = models.IntegerField(
+        verbose_name='Цена в Stripe',
+        help_text='Цена, для которой создан stripe_price_id',
+        **NULLABLE
+    )
+
     def __str__(self):
         return f'{self.name}'
 
+    def save(self, *args, **kwargs):
+        """Перед сохранением извлекает id видео из описания"""
+        self.video_ids = get_video_link_extractor().extract_video_ids(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'description' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'video_ids'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Урок'
         verbose_name_plural = 'Уроки'
+        constraints = [
+            # Уроки без external_id (NULL) под ограничение не попадают
+            models.UniqueConstraint(fields=['course', 'external_id'], name='lesson_course_external_id_uniq'),
+        ]
+        indexes = [
+            # Список уроков владельца с сортировкой по id
+            models.Index(fields=['owner', 'id'], name='lesson_owner_id_idx'),
+        ]
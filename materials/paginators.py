@@ -1,7 +1,32 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
-class MaterialsPagination(PageNumberPagination):
+class MaterialsPageNumberPagination(PageNumberPagination):
     page_size = 5
-    page_query_param = 'page_size'
+    page_size_query_param = 'page_size'
     max_page_size = 10
+
+
+class MaterialsPagination(CursorPagination):
+    """
+    Курсорная пагинация по `id`: страницы выбираются по условию `id > ...` без OFFSET и COUNT(*).
+
+    С параметром `?page=<номер>` используется постраничный режим (`MaterialsPageNumberPagination`).
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 10
+    ordering = 'id'
+    page_mode_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+        if self.page_mode_query_param in request.query_params:
+            self.page_number_paginator = MaterialsPageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,11 +1,34 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 
+from materials.cache import invalidate_courses, invalidate_lessons
 from materials.models import Course, Lesson
-from materials.validators import DescriptionValidator
+from materials.services import get_rate
+from materials.signals import change_course_counter
+from materials.validators import DescriptionValidator, get_video_link_extractor
 from subscription.models import Subscription
 
 
+class IsSubscribedMixin:
+    """
+    Вычисляет поле `is_subscribed` для курса.
+
+    Если queryset аннотирован во вьюсете (`user_is_subscribed`), значение берется из аннотации
+    без дополнительных запросов. Иначе (например, для только что созданного курса)
+    выполняется отдельный запрос.
+    """
+
+    def get_is_subscribed(self, course):
+        user = self.context.get('request').user  # Получаем пользователя из контекста
+        if not user.is_authenticated:
+            return False
+        subscribed = getattr(course, 'user_is_subscribed', None)
+        if subscribed is not None:
+            return subscribed
+        return Subscription.objects.filter(user=user, course=course).exists()  # Проверяем, есть ли подписка на курс
+
+
 class LessonSerializer(serializers.ModelSerializer):
     description = serializers.CharField(
         required=False, allow_blank=True, allow_null=True,
@@ -14,25 +37,116 @@ class LessonSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Lesson
-        fields = '__all__'
+        exclude = ['stripe_product_id', 'stripe_price_id', 'stripe_price_amount']
+        read_only_fields = ['video_ids']
+
 
+class LessonBulkListSerializer(serializers.ListSerializer):
+    """
+    Проверяет и сохраняет список уроков одного курса.
+
+    Ошибки собираются по каждому элементу (`item_errors`). Без частичного режима
+    (`partial_import` в контексте) любая ошибка отклоняет весь список, в частичном
+    режиме сохраняются только корректные элементы.
+    """
+
+    def to_internal_value(self, data):
+        validated, self.valid_indexes, self.item_errors = [], [], []
+        seen_external_ids = set()
+        for index, item in enumerate(data):
+            try:
+                attrs = self.child.run_validation(item)
+                external_id = attrs.get('external_id')
+                if external_id is not None:
+                    if external_id in seen_external_ids:
+                        raise serializers.ValidationError({'external_id': ['Повторяется в списке уроков.']})
+                    seen_external_ids.add(external_id)
+            except serializers.ValidationError as e:
+                self.item_errors.append({'index': index, 'errors': e.detail})
+                continue
+            validated.append(attrs)
+            self.valid_indexes.append(index)
+
+        if self.item_errors and not self.context.get('partial_import'):
+            # Как у обычного ListSerializer: ошибки на позициях элементов, {} у корректных
+            errors = {error['index']: error['errors'] for error in self.item_errors}
+            raise serializers.ValidationError([errors.get(index, {}) for index in range(len(data))])
+        return validated
+
+    def create(self, validated_data):
+        """
+        Вставляет уроки одним запросом; урок с уже существующим `external_id` обновляется.
+
+        bulk_create не вызывает сигналы, поэтому счетчик уроков и версии кэша обновляются здесь.
+        Вызывается в транзакции: строка курса блокируется до ее конца, поэтому параллельные импорты
+        в курс выполняются по очереди, и статусы и прирост счетчика считаются по актуальным урокам.
+        """
+        course = validated_data[0]['course']
+        Course.objects.select_for_update().only('pk').get(pk=course.pk)
+        external_ids = [attrs['external_id'] for attrs in validated_data if attrs.get('external_id') is not None]
+        existing = set(
+            Lesson.objects.filter(course=course, external_id__in=external_ids).values_list('external_id', flat=True)
+        )
 
-class CourseSerializer(serializers.ModelSerializer):
+        extractor = get_video_link_extractor()
+        lessons = Lesson.objects.bulk_create(
+            # bulk_create не вызывает Lesson.save(), id видео извлекаются здесь
+            [Lesson(**attrs, video_ids=extractor.extract_video_ids(attrs.get('description')))
+             for attrs in validated_data],
+            batch_size=settings.LESSON_BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['course', 'external_id'],
+            update_fields=['name', 'description', 'video_ids', 'amount', 'last_updated_lesson'],
+        )
+
+        self.results = []
+        for index, lesson in zip(self.valid_indexes, lessons):
+            lesson.bulk_status = 'updated' if lesson.external_id in existing else 'created'
+            self.results.append({'index': index, 'id': lesson.pk, 'external_id': lesson.external_id,
+                                 'status': lesson.bulk_status})
+
+        created = sum(lesson.bulk_status == 'created' for lesson in lessons)
+        if created:
+            change_course_counter(course.pk, 'lesson_count', created)
+        invalidate_courses()
+        invalidate_lessons()
+        return lessons
+
+
+class LessonBulkSerializer(LessonSerializer):
+    """Урок в массовом импорте: курс и владелец задаются вьюшкой"""
+
+    class Meta:
+        model = Lesson
+        fields = ['name', 'description', 'amount', 'external_id']
+        list_serializer_class = LessonBulkListSerializer
+
+
+class CourseSerializer(IsSubscribedMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()  # Поле вывода подписки
     usd_price = serializers.SerializerMethodField()  # Поле вывода прайса в USD
 
     class Meta:
         model = Course
-        fields = ['id', 'name', 'description', 'is_subscribed', 'amount', 'usd_price']
+        fields = ['id', 'name', 'description', 'is_subscribed', 'amount', 'usd_price',
+                  'lesson_count', 'subscriber_count']
+        read_only_fields = ['lesson_count', 'subscriber_count']
 
-    def get_is_subscribed(self, obj):
-        user = self.context.get('request').user  # Получаем пользователя из контекста
-        if user.is_authenticated:
-            return Subscription.objects.filter(user=user, course=obj).exists()  # Проверяем, есть ли подписка на курс
-        return False
+    def get_usd_price(self, obj):
+        """
+        Цена курса в USD по курсу из кэша (None, пока курс не получен).
+
+        Курс читается один раз на весь ответ и сохраняется в контексте сериализатора.
+        """
+        if 'usd_rate' not in self.context:
+            self.context['usd_rate'] = get_rate('RUB', 'USD')
+        rate = self.context['usd_rate']
+        if rate is None:
+            return None
+        return round(obj.amount * rate, 2)
 
 
-class InfoLessonSerializer(serializers.ModelSerializer):
+class InfoLessonSerializer(IsSubscribedMixin, serializers.ModelSerializer):
     """
     Сериализатор для подробного отображения информации о курсе.
     Включает список уроков и их количество.
@@ -43,19 +157,11 @@ class InfoLessonSerializer(serializers.ModelSerializer):
 
     def get_number_of_lesson(self, course):
         """
-        Метод для подсчета количества уроков в курсе.
-        """
-        return course.lessons.count()
-
-    def get_is_subscribed(self, course):
-        """
-        Метод для получения состояния подписки на курс для текущего пользователя.
+        Количество уроков в курсе (хранится в курсе, без отдельного запроса).
         """
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return Subscription.objects.filter(user=user, course=course).exists()
-        return False
+        return course.lesson_count
 
     class Meta:
         model = Course
-        fields = ('id', 'name', 'description', 'lessons', 'number_of_lesson', 'is_subscribed')
+        fields = ('id', 'name', 'description', 'lessons', 'number_of_lesson', 'is_subscribed',
+                  'lesson_count', 'subscriber_count')
@@ -0,0 +1,130 @@
+import logging
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+RATE_CACHE_KEY = 'currency:rate:{base}:{target}'
+RATE_REFRESH_LOCK_KEY = 'currency:rate:{base}:{target}:refreshing'
+COURSE_UPDATE_PENDING_KEY = 'course:{course_id}:update_email_pending'
+
+
+class CurrencyAPIClient:
+    """
+    Клиент currencyapi.com для получения курса валют.
+    """
+
+    def __init__(self, base_url=None, api_key=None, timeout=None):
+        self.base_url = base_url or settings.CUR_API_URL
+        self.api_key = api_key or settings.CUR_API_KEY
+        self.timeout = timeout or settings.CUR_API_TIMEOUT
+
+    def get_rate(self, base, target):
+        """Возвращает курс `base` -> `target`"""
+        response = requests.get(
+            f'{self.base_url}v3/latest',
+            params={'apikey': self.api_key, 'base_currency': base, 'currencies': target},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return float(response.json()['data'][target]['value'])
+
+
+def refresh_rate(base='RUB', target='USD', client=None):
+    """
+    Запрашивает курс у внешнего API и сохраняет его в кэш.
+
+    Запись хранится `CUR_RATE_STALE_TTL` секунд, чтобы при недоступности API
+    можно было отдавать последний полученный курс.
+    """
+    client = client or CurrencyAPIClient()
+    try:
+        rate = client.get_rate(base, target)
+    except (requests.RequestException, KeyError, ValueError) as e:
+        logger.warning('Не удалось обновить курс %s -> %s: %s', base, target, e)
+        return None
+    finally:
+        cache.delete(RATE_REFRESH_LOCK_KEY.format(base=base, target=target))
+
+    cache.set(
+        RATE_CACHE_KEY.format(base=base, target=target),
+        {'rate': rate, 'fetched_at': time.time()},
+        timeout=settings.CUR_RATE_STALE_TTL,
+    )
+    return rate
+
+
+def schedule_rate_refresh(base='RUB', target='USD'):
+    """
+    Ставит обновление курса в очередь Celery, если оно еще не запланировано.
+    """
+    from materials.tasks import refresh_currency_rate
+
+    if not cache.add(RATE_REFRESH_LOCK_KEY.format(base=base, target=target), True,
+                     timeout=settings.CUR_API_TIMEOUT * 10):
+        return
+    try:
+        refresh_currency_rate.delay(base, target)
+    except Exception as e:  # Брокер недоступен: запрос пользователя не должен падать
+        logger.warning('Не удалось запланировать обновление курса %s -> %s: %s', base, target, e)
+
+
+def get_rate(base='RUB', target='USD'):
+    """
+    Возвращает курс из кэша, никогда не обращаясь к внешнему API.
+
+    Если курс устарел (старше `CUR_RATE_TTL`), отдается сохраненное значение,
+    а обновление запускается в фоне. Если курса в кэше нет, возвращается None.
+    """
+    entry = cache.get(RATE_CACHE_KEY.format(base=base, target=target))
+    if entry is None:
+        schedule_rate_refresh(base, target)
+        return None
+    if time.time() - entry['fetched_at'] > settings.CUR_RATE_TTL:
+        schedule_rate_refresh(base, target)
+    return entry['rate']
+
+
+def schedule_course_update_email(course_id):
+    """
+    Планирует рассылку об обновлении курса через `COURSE_UPDATE_EMAIL_DEBOUNCE` секунд.
+
+    Пока рассылка ожидает запуска, повторные обновления курса не создают новых задач,
+    а попадают в уже запланированную. Возвращает True, если рассылка запланирована этим вызовом.
+    Если задачу не удалось поставить в очередь, отметка снимается и возвращается False.
+    """
+    from materials.tasks import fan_out_course_update_email
+
+    window = settings.COURSE_UPDATE_EMAIL_DEBOUNCE
+    key = COURSE_UPDATE_PENDING_KEY.format(course_id=course_id)
+    token = uuid.uuid4().hex
+    # Ключ живет дольше окна, чтобы задержка воркера не приводила к повторной рассылке
+    if not cache.add(key, token, timeout=window * 10):
+        return False
+
+    try:
+        fan_out_course_update_email.apply_async(args=[course_id], kwargs={'token': token}, countdown=window)
+    except Exception as e:  # Брокер недоступен: снимаем отметку, чтобы не подавлять следующие рассылки
+        if cache.get(key) == token:
+            cache.delete(key)
+        logger.warning('Не удалось запланировать рассылку об обновлении курса %s: %s', course_id, e)
+        return False
+    return True
+
+
+def claim_course_update_email(course_id, token):
+    """
+    Снимает отметку об ожидающей рассылке перед ее запуском.
+
+    Возвращает False, если отметку уже занял другой (более новый) вызов `schedule_course_update_email`.
+    """
+    key = COURSE_UPDATE_PENDING_KEY.format(course_id=course_id)
+    pending = cache.get(key)
+    if pending is not None and pending != token:
+        return False
+    cache.delete(key)
+    return True
@@ -0,0 +1,56 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from materials.cache import invalidate_courses, invalidate_lessons
+from materials.models import Course, Lesson
+
+
+def change_course_counter(course_id, field, delta):
+    """Атомарно изменяет счетчик курса на `delta` (не опуская его ниже нуля)"""
+    Course.objects.filter(pk=course_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change_courses_counter(course_ids, field, delta):
+    """То же для нескольких курсов одним запросом (для массовых операций, обходящих сигналы)"""
+    if course_ids:
+        Course.objects.filter(pk__in=course_ids).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_course(sender, instance, raw, update_fields, **kwargs):
+    """Запоминает прежний курс урока, чтобы при переносе урока поправить счетчики обоих курсов"""
+    instance._previous_course_id = None
+    if raw or instance._state.adding or (update_fields is not None and 'course' not in update_fields):
+        return
+    instance._previous_course_id = Lesson.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Lesson)
+def count_saved_lesson(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        change_course_counter(instance.course_id, 'lesson_count', 1)
+        return
+    previous_course_id = getattr(instance, '_previous_course_id', None)
+    if previous_course_id is not None and previous_course_id != instance.course_id:
+        change_course_counter(previous_course_id, 'lesson_count', -1)
+        change_course_counter(instance.course_id, 'lesson_count', 1)
+
+
+@receiver(post_delete, sender=Lesson)
+def count_deleted_lesson(sender, instance, **kwargs):
+    change_course_counter(instance.course_id, 'lesson_count', -1)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_course_cache(sender, **kwargs):
+    invalidate_courses()
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_lesson_cache(sender, **kwargs):
+    invalidate_lessons()
@@ -1,11 +1,48 @@
 # courses/tasks.py
-from celery import shared_task
+import logging
+import math
+
+from celery import chord, shared_task
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Max, Min
 
-from config import settings
 from subscription.models import Subscription
 from .models import Course
+from .services import claim_course_update_email, refresh_rate
+
+logger = logging.getLogger(__name__)
+
+
+def send_course_update_messages(course, subscribers, connection):
+    """
+    Отправляет письмо об обновлении курса подписчикам из queryset `subscribers`.
+
+    Подписчики читаются пачками по `COURSE_UPDATE_EMAIL_CHUNK_SIZE` (по возрастанию id подписки),
+    из БД выбираются только адреса, все письма уходят через одно соединение `connection`.
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    subject = f"Обновление курса: {course.name}"
+    message = f"Курс {course.name} был обновлен. Посмотрите новые материалы!"
+    from_email = settings.DEFAULT_FROM_EMAIL
+    chunk_size = settings.COURSE_UPDATE_EMAIL_CHUNK_SIZE
+
+    sent = failed = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            subscribers.filter(id__gt=last_id).order_by('id').values_list('id', 'user__email')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        messages = [EmailMessage(subject, message, from_email, [email]) for _, email in chunk]
+        chunk_sent = connection.send_messages(messages) or 0
+        sent += chunk_sent
+        failed += len(messages) - chunk_sent
+
+    return sent, failed
 
 
 @shared_task
@@ -15,20 +52,86 @@ def send_course_update_email(course_id):
     """
     try:
         course = Course.objects.get(id=course_id)
-        # Получаем всех пользователей, подписанных на курс через модель Subscription
-        subscribers = Subscription.objects.filter(course=course)
+    except Course.DoesNotExist:
+        return f"Курс с ID {course_id} не найден."
 
-        # Тема и текст письма
-        subject = f"Обновление курса: {course.name}"
-        message = f"Курс {course.name} был обновлен. Посмотрите новые материалы!"
-        from_email = settings.DEFAULT_FROM_EMAIL
+    # Получаем всех пользователей, подписанных на курс через модель Subscription
+    subscribers = Subscription.objects.filter(course=course)
 
-        # Отправка письма всем подписанным пользователям
-        for subscription in subscribers:
-            user = subscription.user
-            send_mail(subject, message, from_email, [user.email])
+    # Одно SMTP-соединение на всю рассылку
+    with get_connection(fail_silently=True) as connection:
+        sent, failed = send_course_update_messages(course, subscribers, connection)
 
-        return f"Рассылка для курса {course.name} завершена."
+    return f"Рассылка для курса {course.name} завершена. Отправлено: {sent}, ошибок: {failed}."
 
-    except Course.DoesNotExist:
-        return f"Курс с ID {course_id} не найден."
+
+@shared_task
+def send_course_update_email_chunk(course_id, start_id, end_id):
+    """
+    Рассылка подписчикам курса, id подписки которых лежит в диапазоне [start_id, end_id].
+
+    Возвращает количество отправленных и неотправленных писем.
+    """
+    course = Course.objects.filter(id=course_id).first()
+    if course is None:
+        return {'sent': 0, 'failed': 0}
+
+    subscribers = Subscription.objects.filter(course=course, id__gte=start_id, id__lte=end_id)
+    with get_connection(fail_silently=True) as connection:
+        sent, failed = send_course_update_messages(course, subscribers, connection)
+
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def collect_course_update_results(results, course_id):
+    """
+    Собирает итог параллельной рассылки по всем диапазонам подписчиков.
+    """
+    total = {
+        'course_id': course_id,
+        'sent': sum(result['sent'] for result in results),
+        'failed': sum(result['failed'] for result in results),
+    }
+    logger.info('Рассылка для курса %s завершена: отправлено %s, ошибок %s',
+                course_id, total['sent'], total['failed'])
+    return total
+
+
+@shared_task
+def fan_out_course_update_email(course_id, token=None):
+    """
+    Координатор рассылки об обновлении курса.
+
+    Если передан `token` (отложенный запуск из `schedule_course_update_email`), рассылка
+    выполняется только при совпадении с ожидающей отметкой курса. Делит диапазон id подписок курса на отрезки и запускает их параллельно (chord):
+    каждый отрезок содержит не меньше `COURSE_UPDATE_FANOUT_CHUNK_SIZE` id, а отрезков
+    не больше `COURSE_UPDATE_FANOUT_CONCURRENCY`. Итог собирает `collect_course_update_results`.
+    """
+    if token is not None and not claim_course_update_email(course_id, token):
+        return {'course_id': course_id, 'chunks': 0, 'result_id': None}
+
+    bounds = Subscription.objects.filter(course_id=course_id).aggregate(first=Min('id'), last=Max('id'))
+    if bounds['first'] is None:
+        return {'course_id': course_id, 'chunks': 0, 'result_id': None}
+
+    first, last = bounds['first'], bounds['last']
+    chunk_size = max(
+        settings.COURSE_UPDATE_FANOUT_CHUNK_SIZE,
+        math.ceil((last - first + 1) / settings.COURSE_UPDATE_FANOUT_CONCURRENCY),
+    )
+    ranges = [(start, min(start + chunk_size - 1, last)) for start in range(first, last + 1, chunk_size)]
+
+    result = chord(
+        send_course_update_email_chunk.s(course_id, start, end) for start, end in ranges
+    )(collect_course_update_results.s(course_id))
+
+    return {'course_id': course_id, 'chunks': len(ranges), 'result_id': result.id}
+
+
+@shared_task
+def refresh_currency_rate(base='RUB', target='USD'):
+    """
+    Периодическая задача обновления курса валют в кэше.
+    """
+    return refresh_rate(base, target)
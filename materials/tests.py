@@ -1,14 +1,55 @@
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipIf
+
+import requests
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 
+from config import celery_app
 from materials.models import Course, Lesson
+from materials.serializers import LessonSerializer
+from materials.services import RATE_CACHE_KEY, get_rate, refresh_rate, schedule_course_update_email
+from materials.tasks import collect_course_update_results, fan_out_course_update_email, send_course_update_email
+from materials.validators import DescriptionValidator, get_video_link_extractor
+from subscription.models import Subscription
 
 User = get_user_model()
 
 
+class StubCurrencyClient:
+    """Локальная замена currencyapi.com"""
+
+    def __init__(self, rate=0.01, error=None):
+        self.rate = rate
+        self.error = error
+        self.calls = 0
+
+    def get_rate(self, base, target):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.rate
+
+
 class CourseTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+        refresh_rate('RUB', 'USD', client=StubCurrencyClient(rate=0.01))
+
         self.user = User.objects.create_user(email='alina@fob.ru',
                                              password='Poma2404')
         self.client.force_authenticate(user=self.user)
@@ -54,12 +95,10 @@ class CourseTestCase(APITestCase):
         )
 
         self.assertEqual(response.json(),
-                         {'id': 2, 'name': 'Django course',
+                         {'id': response.json()['id'], 'name': 'Django course',
                           'description': 'Django laerning description',
-                          'is_subscribed': False},
-                         {'id': 3, 'name': 'Python course',
-                          'description': 'Ссылка на источник https://www.youtube.com/',
-                          'is_subscribed': True}
+                          'is_subscribed': False, 'amount': 1, 'usd_price': 0.01,
+                          'lesson_count': 0, 'subscriber_count': 0}
                          )
 
         self.assertTrue(
@@ -78,11 +117,129 @@ class CourseTestCase(APITestCase):
                 'name': self.course.name,
                 'description': self.course.description,
                 'is_subscribed': False,
-
+                'amount': self.course.amount,
+                'usd_price': round(self.course.amount * 0.01, 2),
+                'lesson_count': 2,
+                'subscriber_count': 0,
             }
         ]
         self.assertEqual(courses, expected_data)
 
+    def test_list_course_cache(self):
+        """Повторный запрос списка отдается из кэша, подписка подставляется для каждого пользователя"""
+        self.client.get('/course/')
+        with self.assertNumQueries(1):  # только подписки пользователя
+            response = self.client.get('/course/')
+        with self.assertNumQueries(0):
+            self.client.get('/course/')
+        self.assertFalse(response.data['results'][0]['is_subscribed'])
+
+        # Подписка меняет только признак подписки текущего пользователя и счетчик
+        Subscription.objects.create(user=self.user, course=self.course)
+        response = self.client.get('/course/')
+        self.assertTrue(response.data['results'][0]['is_subscribed'])
+        self.assertEqual(response.data['results'][0]['subscriber_count'], 1)
+
+        other = User.objects.create_user(email='other@fob.ru', password='Poma2404')
+        self.client.force_authenticate(user=other)
+        response = self.client.get('/course/')
+        self.assertFalse(response.data['results'][0]['is_subscribed'])
+
+    def test_retrieve_course_cache_invalidation(self):
+        """Изменение курса или урока сбрасывает закэшированную карточку курса"""
+        self.client.get(f'/course/{self.course.id}/')
+
+        Course.objects.filter(id=self.course.id).update(name='Stale')  # без сигналов кэш не сбрасывается
+        self.assertEqual(self.client.get(f'/course/{self.course.id}/').data['name'], self.course.name)
+
+        self.lesson1.name = 'Renamed lesson'
+        self.lesson1.save()
+        response = self.client.get(f'/course/{self.course.id}/')
+        self.assertEqual(response.data['name'], 'Stale')
+        self.assertEqual(response.data['lessons'][0]['name'], 'Renamed lesson')
+
+    def test_list_course_not_modified(self):
+        """Повторный запрос с ETag возвращает 304, изменение курса меняет ETag"""
+        response = self.client.get('/course/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):  # валидаторы из версий кэша, без сериализации
+            response = self.client.get('/course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Subscription.objects.create(user=self.user, course=self.course)
+        response = self.client.get('/course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_course_etag_depends_on_rate(self):
+        """ETag списка меняется вместе с курсом валют, от которого зависит usd_price"""
+        etag = self.client.get('/course/')['ETag']
+
+        cache.set(RATE_CACHE_KEY.format(base='RUB', target='USD'), {'rate': 0.02, 'fetched_at': time.time()})
+        response = self.client.get('/course/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['usd_price'], round(self.course.amount * 0.02, 2))
+
+    def test_retrieve_course_not_modified(self):
+        """Карточка курса поддерживает If-None-Match; If-Modified-Since не дает устаревший 304"""
+        response = self.client.get(f'/course/{self.course.id}/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get(f'/course/{self.course.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Подписка не меняет дату курса, но меняет ответ
+        Subscription.objects.create(user=self.user, course=self.course)
+        response = self.client.get(f'/course/{self.course.id}/', HTTP_IF_NONE_MATCH=etag,
+                                   HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_subscribed'])
+
+        self.assertEqual(self.client.get('/course/0/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lesson_not_modified(self):
+        """Урок и список уроков возвращают 304, пока урок не изменился"""
+        self.lesson1.owner = self.user
+        self.lesson1.save()
+
+        for url in (f'/lesson/{self.lesson1.id}/', '/lesson/list/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+
+        Lesson.objects.create(name='Lesson 3', course=self.course, owner=self.user)
+        response = self.client.get('/lesson/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_course_cursor_pagination(self):
+        """Курсорная пагинация проходит все курсы по порядку id без пропусков и повторов"""
+        courses = [self.course] + [Course.objects.create(name=f'Course {i}') for i in range(6)]
+
+        ids = []
+        url = '/course/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(course['id'] for course in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(ids, [course.id for course in courses])
+
+    def test_list_course_page_number_mode(self):
+        """С параметром page используется постраничный режим с общим количеством"""
+        for i in range(6):
+            Course.objects.create(name=f'Course {i}')
+
+        response = self.client.get('/course/', {'page': 2, 'page_size': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 3)
+
     def test_retrieve_course(self):
         """тестирование получения конкретного курса"""
 
@@ -93,14 +250,11 @@ class CourseTestCase(APITestCase):
             'id': self.course.id,
             'name': self.course.name,
             'description': self.course.description,
-            'lessons': [
-                {'id': self.lesson1.id, 'name': self.lesson1.name, 'description': self.lesson1.description,
-                 'image': None, 'course': self.course.id, 'owner': None},
-                {'id': self.lesson2.id, 'name': self.lesson2.name, 'description': self.lesson2.description,
-                 'image': None, 'course': self.course.id, 'owner': None},
-            ],
+            'lessons': [LessonSerializer(self.lesson1).data, LessonSerializer(self.lesson2).data],
             'number_of_lesson': 2,
             'is_subscribed': False,
+            'lesson_count': 2,
+            'subscriber_count': 0,
         }
 
         self.assertEqual(response.json(), expected_data)
@@ -119,6 +273,45 @@ class CourseTestCase(APITestCase):
         self.assertEqual(self.course.name, 'Test update')
         self.assertEqual(self.course.description, 'Test update desc')
 
+    @mock.patch('materials.tasks.fan_out_course_update_email.apply_async')
+    def test_update_course_coalesces_emails(self, apply_async):
+        """Несколько обновлений курса подряд планируют одну отложенную рассылку"""
+        for name in ('Edit 1', 'Edit 2', 'Edit 3'):
+            response = self.client.patch(f'/course/{self.course.id}/', data={'name': name})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'], [self.course.id])
+        self.assertEqual(apply_async.call_args.kwargs['countdown'], settings.COURSE_UPDATE_EMAIL_DEBOUNCE)
+
+    @mock.patch('materials.tasks.fan_out_course_update_email.apply_async')
+    def test_update_course_email_broker_unavailable(self, apply_async):
+        """Если брокер недоступен, отметка о рассылке снимается и следующее обновление планирует ее снова"""
+        apply_async.side_effect = OSError('broker down')
+
+        self.assertFalse(schedule_course_update_email(self.course.id))
+
+        apply_async.side_effect = None
+        self.assertTrue(schedule_course_update_email(self.course.id))
+        self.assertEqual(apply_async.call_count, 2)
+
+    @mock.patch('materials.tasks.fan_out_course_update_email.apply_async')
+    def test_update_course_email_shared_cache(self, apply_async):
+        """Отметку, поставленную веб-процессом, снимает воркер через общий кэш"""
+        with tempfile.TemporaryDirectory() as location:
+            # Отдельные экземпляры бэкенда с общим хранилищем, как у веб-процесса и воркера с Redis
+            web_cache, worker_cache = FileBasedCache(location, {}), FileBasedCache(location, {})
+            with mock.patch('materials.services.cache', web_cache):
+                self.assertTrue(schedule_course_update_email(self.course.id))
+            token = apply_async.call_args.kwargs['kwargs']['token']
+
+            with mock.patch('materials.services.cache', worker_cache):
+                fan_out_course_update_email(self.course.id, token=token)
+
+            with mock.patch('materials.services.cache', web_cache):
+                self.assertTrue(schedule_course_update_email(self.course.id))
+        self.assertEqual(apply_async.call_count, 2)
+
     def test_delete_course(self):
         """Тестирование удаления курса"""
 
@@ -127,6 +320,352 @@ class CourseTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Course.objects.filter(id=self.course.id).exists())
 
+    def test_list_course_queries(self):
+        """Количество запросов на страницу списка не зависит от числа курсов и подписок"""
+        for i in range(4):
+            course = Course.objects.create(name=f'Course {i}', description='desc')
+            Subscription.objects.create(user=self.user, course=course)
+
+        with self.assertNumQueries(1):  # курсорная пагинация не выполняет COUNT
+            response = self.client.get('/course/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        subscribed = {course['id']: course['is_subscribed'] for course in response.data['results']}
+        self.assertFalse(subscribed[self.course.id])
+        self.assertEqual(sum(subscribed.values()), 4)
+
+    def test_retrieve_course_queries(self):
+        """Детальный просмотр курса не выполняет отдельный COUNT по урокам"""
+        with self.assertNumQueries(2):  # курс и подгрузка уроков
+            response = self.client.get(f'/course/{self.course.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['number_of_lesson'], 2)
+        self.assertEqual(len(response.data['lessons']), 2)
+
+
+class CurrencyRateTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_refresh_rate(self):
+        """Курс из API сохраняется в кэш и читается без обращения к API"""
+        client = StubCurrencyClient(rate=0.0105)
+
+        self.assertEqual(refresh_rate('RUB', 'USD', client=client), 0.0105)
+        self.assertEqual(get_rate('RUB', 'USD'), 0.0105)
+        self.assertEqual(client.calls, 1)
+
+    @mock.patch('materials.tasks.refresh_currency_rate.delay')
+    def test_missing_rate_schedules_refresh(self, delay):
+        """Без курса в кэше возвращается None, а обновление ставится в очередь один раз"""
+        self.assertIsNone(get_rate('RUB', 'USD'))
+        self.assertIsNone(get_rate('RUB', 'USD'))
+
+        delay.assert_called_once_with('RUB', 'USD')
+
+    @mock.patch('materials.tasks.refresh_currency_rate.delay')
+    def test_stale_rate_is_served(self, delay):
+        """Устаревший курс отдается сразу, обновление идет в фоне"""
+        cache.set(RATE_CACHE_KEY.format(base='RUB', target='USD'),
+                  {'rate': 0.01, 'fetched_at': time.time() - 2 * 60 * 60})
+
+        self.assertEqual(get_rate('RUB', 'USD'), 0.01)
+        delay.assert_called_once_with('RUB', 'USD')
+
+    def test_failed_refresh_keeps_previous_rate(self):
+        """Ошибка API не затирает ранее полученный курс"""
+        refresh_rate('RUB', 'USD', client=StubCurrencyClient(rate=0.01))
+
+        failing = StubCurrencyClient(error=requests.ConnectionError('currencyapi is down'))
+        self.assertIsNone(refresh_rate('RUB', 'USD', client=failing))
+        self.assertEqual(get_rate('RUB', 'USD'), 0.01)
+
+
+class CourseUpdateEmailTestCase(TestCase):
+    def setUp(self):
+        # Задачи Celery выполняются синхронно, письма попадают в mail.outbox (locmem)
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', always_eager)
+
+        self.course = Course.objects.create(name="Advanced Django")
+        self.users = [User.objects.create_user(email=f'user{i}@fob.ru', password='Poma2404') for i in range(5)]
+        for user in self.users:
+            Subscription.objects.create(user=user, course=self.course)
+
+    @override_settings(COURSE_UPDATE_EMAIL_CHUNK_SIZE=2)
+    def test_send_course_update_email(self):
+        """Рассылка выбирает только адреса пачками и отправляет письмо каждому подписчику"""
+        with self.assertNumQueries(5):  # курс, три пачки подписчиков и пустая пачка
+            result = send_course_update_email(self.course.id)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual({message.to[0] for message in mail.outbox}, {user.email for user in self.users})
+        self.assertIn('Отправлено: 5', result)
+
+    @override_settings(COURSE_UPDATE_FANOUT_CHUNK_SIZE=2, COURSE_UPDATE_FANOUT_CONCURRENCY=2)
+    def test_fan_out_course_update_email(self):
+        """Координатор делит подписчиков на диапазоны, каждое письмо отправляется один раз"""
+        result = fan_out_course_update_email.apply(args=[self.course.id]).get()
+
+        self.assertEqual(result['chunks'], 2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         sorted(user.email for user in self.users))
+
+    def test_fan_out_course_update_email_without_subscribers(self):
+        """Курс без подписчиков не порождает задач рассылки"""
+        Subscription.objects.all().delete()
+
+        result = fan_out_course_update_email.apply(args=[self.course.id]).get()
+
+        self.assertEqual(result['chunks'], 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @mock.patch('materials.tasks.fan_out_course_update_email.apply_async')
+    def test_stale_token_is_skipped(self, apply_async):
+        """Отложенная рассылка с чужим токеном не выполняется"""
+        cache.clear()
+        schedule_course_update_email(self.course.id)
+        token = apply_async.call_args.kwargs['kwargs']['token']
+
+        skipped = fan_out_course_update_email.apply(args=[self.course.id], kwargs={'token': 'stale'}).get()
+        self.assertEqual(skipped['chunks'], 0)
+
+        result = fan_out_course_update_email.apply(args=[self.course.id], kwargs={'token': token}).get()
+        self.assertEqual(result['chunks'], 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_collect_course_update_results(self):
+        """Итог рассылки суммирует результаты всех диапазонов"""
+        result = collect_course_update_results([{'sent': 2, 'failed': 0}, {'sent': 2, 'failed': 1}], self.course.id)
+
+        self.assertEqual(result, {'course_id': self.course.id, 'sent': 4, 'failed': 1})
+
+    def test_send_course_update_email_missing_course(self):
+        """Для несуществующего курса письма не отправляются"""
+        send_course_update_email(self.course.id + 1)
+
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class ExplainHotQueriesTestCase(TestCase):
+    def test_explain_hot_queries(self):
+        """Команда выводит результат EXPLAIN по каждому горячему запросу"""
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+
+        output = out.getvalue()
+        for name in ('Уроки владельца', 'История платежей пользователя', 'Подписчики курса',
+                     'Неактивные пользователи'):
+            self.assertIn(name, output)
+        self.assertIn('Уроки владельца: индекс', output)
+
+
+class CourseCountersTestCase(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Advanced Django')
+        self.other_course = Course.objects.create(name='Python')
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+
+    def assertCounters(self, course, lesson_count, subscriber_count):
+        course.refresh_from_db()
+        self.assertEqual((course.lesson_count, course.subscriber_count), (lesson_count, subscriber_count))
+
+    def test_lesson_counter(self):
+        """Счетчик уроков меняется при создании, удалении и переносе урока"""
+        lesson = Lesson.objects.create(name='Lesson 1', course=self.course)
+        Lesson.objects.create(name='Lesson 2', course=self.course)
+        self.assertCounters(self.course, 2, 0)
+
+        lesson.course = self.other_course
+        lesson.save()
+        self.assertCounters(self.course, 1, 0)
+        self.assertCounters(self.other_course, 1, 0)
+
+        lesson.delete()
+        self.assertCounters(self.other_course, 0, 0)
+
+    def test_subscriber_counter(self):
+        """Счетчик подписчиков меняется при подписке и отписке"""
+        subscription = Subscription.objects.create(user=self.user, course=self.course)
+        self.assertCounters(self.course, 0, 1)
+
+        subscription.delete()
+        self.assertCounters(self.course, 0, 0)
+
+    def test_stale_course_save_keeps_counters(self):
+        """Сохранение устаревшего экземпляра курса не затирает счетчики"""
+        stale = Course.objects.get(id=self.course.id)
+        Lesson.objects.create(name='Lesson 1', course=self.course)
+
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertCounters(self.course, 1, 0)
+        self.assertEqual(self.course.name, 'Renamed')
+
+    def test_reconcile_course_counters(self):
+        """Команда исправляет расхождения счетчиков с фактическими данными"""
+        Lesson.objects.create(name='Lesson 1', course=self.course)
+        Subscription.objects.create(user=self.user, course=self.course)
+        Course.objects.update(lesson_count=10, subscriber_count=0)
+
+        out = StringIO()
+        call_command('reconcile_course_counters', batch_size=1, stdout=out)
+
+        self.assertCounters(self.course, 1, 1)
+        self.assertCounters(self.other_course, 0, 0)
+        self.assertIn('Исправлено курсов: 2', out.getvalue())
+
+
+class LessonBulkTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Advanced Django', owner=self.user)
+        self.url = f'/course/{self.course.id}/lessons/bulk/'
+
+    @staticmethod
+    def lesson(number, **kwargs):
+        return {'name': f'Lesson {number}', 'description': f'https://youtu.be/video{number}', **kwargs}
+
+    def test_bulk_create(self):
+        """Уроки вставляются одним запросом, счетчик курса обновляется"""
+        data = [self.lesson(number, external_id=f'ext-{number}') for number in range(30)]
+
+        # курс, SAVEPOINT, блокировка курса, выборка существующих external_id, INSERT, счетчик, RELEASE SAVEPOINT
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual({result['status'] for result in response.json()['results']}, {'created'})
+        self.assertEqual(Lesson.objects.filter(course=self.course, owner=self.user).count(), 30)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lesson_count, 30)
+
+    def test_bulk_upsert(self):
+        """Урок с существующим external_id обновляется, а не дублируется"""
+        lesson = Lesson.objects.create(name='Old', course=self.course, external_id='ext-1')
+
+        response = self.client.post(self.url, [self.lesson(1, external_id='ext-1'), self.lesson(2)], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['updated', 'created'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.name, 'Lesson 1')
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 2)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lesson_count, 2)
+
+    def test_bulk_invalid_aborts(self):
+        """Без частичного режима ошибка в одном уроке отклоняет весь список"""
+        data = [self.lesson(1), {'name': 'Lesson 2', 'description': 'без ссылки'}]
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn('description', response.json()[1])
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_bulk_partial(self):
+        """В частичном режиме корректные уроки сохраняются, ошибки возвращаются по индексам"""
+        data = [self.lesson(1, external_id='ext-1'), {'name': 'Lesson 2', 'description': 'без ссылки'},
+                self.lesson(3, external_id='ext-1')]
+
+        response = self.client.post(f'{self.url}?partial=true', data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['index'] for result in response.json()['results']], [0])
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_bulk_not_owner(self):
+        """Импортировать уроки в чужой курс нельзя"""
+        self.course.owner = None
+        self.course.save()
+
+        response = self.client.post(self.url, [self.lesson(1)], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite блокирует таблицу при параллельной записи')
+class LessonBulkConcurrencyTestCase(APITransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.course = Course.objects.create(name='Advanced Django', owner=self.user)
+        self.url = f'/course/{self.course.id}/lessons/bulk/'
+
+    def test_parallel_import(self):
+        """Параллельный импорт одних и тех же уроков создает их один раз и не завышает счетчик"""
+        threads_count = 2
+        barrier = threading.Barrier(threads_count)
+        statuses = []
+        data = [LessonBulkTestCase.lesson(number, external_id=f'ext-{number}') for number in range(5)]
+
+        def import_lessons():
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            barrier.wait()
+            try:
+                response = client.post(self.url, data, format='json')
+                statuses.append([result['status'] for result in response.json()['results']])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=import_lessons) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertCountEqual(statuses, [['created'] * 5, ['updated'] * 5])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lesson_count, 5)
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 5)
+
+class VideoLinkExtractorTestCase(TestCase):
+    def test_extract_video_ids(self):
+        """Id видео извлекаются из ссылок разных форматов без повторов"""
+        extractor = get_video_link_extractor()
+        text = ('Смотрите https://www.youtube.com/watch?v=dQw4w9WgXcQ и https://youtu.be/dQw4w9WgXcQ, '
+                'https://m.youtube.com/watch?t=10&v=abcdefghijk, https://youtube.com/shorts/ABCDEFGHIJK '
+                'и https://vimeo.com/123456')
+
+        self.assertEqual(extractor.extract_video_ids(text), ['dQw4w9WgXcQ', 'abcdefghijk', 'ABCDEFGHIJK'])
+        self.assertEqual(extractor.extract_video_ids(None), [])
+        self.assertTrue(extractor.has_link('https://youtube.com/channel/django'))
+        self.assertFalse(extractor.has_link('https://example.com/watch?v=dQw4w9WgXcQ'))
+
+    def test_allowed_hosts(self):
+        """Набор разрешенных хостов настраивается"""
+        with override_settings(ALLOWED_VIDEO_HOSTS=['vimeo.com']):
+            with self.assertRaises(ValidationError):
+                DescriptionValidator(field='description')('https://youtu.be/dQw4w9WgXcQ')
+            self.assertEqual(get_video_link_extractor().extract_video_ids('https://vimeo.com/123456'), ['123456'])
+
+        with self.assertRaises(ImproperlyConfigured):
+            get_video_link_extractor(['example.com'])
+
+    def test_lesson_video_ids(self):
+        """Id видео сохраняются в уроке при создании и изменении описания"""
+        course = Course.objects.create(name='Advanced Django')
+        lesson = Lesson.objects.create(name='Lesson 1', course=course,
+                                       description='https://youtu.be/dQw4w9WgXcQ')
+        self.assertEqual(lesson.video_ids, ['dQw4w9WgXcQ'])
 
+        lesson.description = 'https://www.youtube.com/embed/abcdefghijk'
+        lesson.save(update_fields=['description'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.video_ids, ['abcdefghijk'])
 
+    def test_benchmark_command(self):
+        """Команда замеров выводит время для каждого варианта описания"""
+        out = StringIO()
+        call_command('benchmark_description_validator', sizes='1000', number=1, stdout=out)
 
+        self.assertIn('1000 символов, ссылка в конце:', out.getvalue())
+        self.assertIn('extract_video_ids', out.getvalue())
@@ -2,8 +2,8 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from materials.apps import MaterialsConfig
-from materials.views import CourseViewSet, LessonCreateAPIView, LessonListAPIView, LessonRetrieveAPIView, \
-    LessonUpdateAPIView, LessonDestroyAPIView
+from materials.views import CourseViewSet, LessonBulkAPIView, LessonCreateAPIView, LessonListAPIView, \
+    LessonRetrieveAPIView, LessonUpdateAPIView, LessonDestroyAPIView
 
 app_name = MaterialsConfig.name
 # Настройка маршрутов для CourseViewSet
@@ -12,6 +12,7 @@ router.register(r'course', CourseViewSet, basename='course')
 
 urlpatterns = [
                   path('lesson/create/', LessonCreateAPIView.as_view(), name='lesson-create'),
+                  path('course/<int:course_id>/lessons/bulk/', LessonBulkAPIView.as_view(), name='lesson-bulk'),
                   path('lesson/list/', LessonListAPIView.as_view(), name='lesson-list'),
                   path('lesson/<int:pk>/', LessonRetrieveAPIView.as_view(), name='lesson-retrieve'),
                   path('lesson/update/<int:pk>/', LessonUpdateAPIView.as_view(), name='lesson-update'),
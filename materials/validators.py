@@ -1,23 +1,79 @@
 import re
+from functools import lru_cache
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.exceptions import ValidationError
 
+# Поддерживаемые видеохостинги: имя хоста -> (регулярное выражение хоста, путь до id видео с группой id)
+VIDEO_HOSTS = {
+    'youtube.com': (r'youtube\.com', r'youtube\.com/(?:watch\?(?:[^\s&#]*&)*v=|embed/|shorts/|live/)([\w-]{11})'),
+    'youtu.be': (r'youtu\.be', r'youtu\.be/([\w-]{11})'),
+    'vimeo.com': (r'vimeo\.com', r'vimeo\.com/(?:video/)?(\d+)'),
+}
+
+_LINK_PREFIX = r'https?://(?:www\.|m\.|player\.)?'
+
+
+class VideoLinkExtractor:
+    """
+    Поиск ссылок на видео в тексте.
+
+    Регулярные выражения компилируются один раз на набор хостов. Оба выражения начинаются
+    с литерала `http`, поэтому движок re сам пропускает текст до ближайшего кандидата
+    в ссылки: отдельная проверка подстрок (`'://' in text`) по замерам только замедляет поиск
+    (см. команду benchmark_description_validator).
+    """
+
+    def __init__(self, hosts):
+        unknown = set(hosts) - set(VIDEO_HOSTS)
+        if unknown:
+            raise ImproperlyConfigured(f'Неизвестные видеохостинги: {", ".join(sorted(unknown))}')
+        self.hosts = tuple(hosts)
+        self.link_pattern = re.compile(
+            _LINK_PREFIX + '(?:' + '|'.join(VIDEO_HOSTS[host][0] for host in self.hosts) + r')/\S+'
+        )
+        # У каждой альтернативы одна группа, поэтому id находится в группе match.lastindex
+        self.video_pattern = re.compile(
+            _LINK_PREFIX + '(?:' + '|'.join(VIDEO_HOSTS[host][1] for host in self.hosts) + ')'
+        )
+
+    def has_link(self, text):
+        """Есть ли в тексте хотя бы одна ссылка на разрешенный хост"""
+        return bool(text) and self.link_pattern.search(text) is not None
+
+    def extract_video_ids(self, text):
+        """Id видео из всех ссылок текста, без повторов, в порядке появления"""
+        if not text:
+            return []
+        return list(dict.fromkeys(match.group(match.lastindex) for match in self.video_pattern.finditer(text)))
+
+
+@lru_cache(maxsize=None)
+def _extractor_for(hosts):
+    return VideoLinkExtractor(hosts)
+
+
+def get_video_link_extractor(hosts=None):
+    """Общий экземпляр `VideoLinkExtractor` для хостов из `ALLOWED_VIDEO_HOSTS` (или переданных)"""
+    return _extractor_for(tuple(hosts or settings.ALLOWED_VIDEO_HOSTS))
+
 
 class DescriptionValidator:
-    def __init__(self, field):
+    def __init__(self, field, hosts=None):
         self.field = field
+        self.hosts = hosts
 
     def __call__(self, value):
         """
-        Проверяет, содержит ли поле хотя бы одну ссылку на YouTube.
+        Проверяет, содержит ли поле хотя бы одну ссылку на разрешенный видеохостинг.
         """
 
         if not isinstance(value, str):
             raise ValidationError(f"Поле '{self.field}' должно содержать строку.")
 
-        # Регулярное выражение для поиска ссылок на YouTube в тексте
-        youtube_pattern = re.compile(r"https?://(www\.)?(youtube\.com|youtu\.be)/\S+")
-
-        # Ищем ссылку в тексте
-        if not youtube_pattern.search(value):
-            raise ValidationError(f"Поле '{self.field}' должно содержать хотя бы одну ссылку на YouTube.")
\ No newline at end of file
+        extractor = get_video_link_extractor(self.hosts)
+        if not extractor.has_link(value):
+            raise ValidationError(
+                f"Поле '{self.field}' должно содержать хотя бы одну ссылку на видео ({', '.join(extractor.hosts)})."
+            )
@@ -1,14 +1,24 @@
-from rest_framework import viewsets, generics
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from rest_framework import viewsets, generics, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from materials.cache import COURSES_VERSION_KEY, LESSONS_VERSION_KEY, SUBSCRIPTIONS_VERSION_KEY, course_detail_key, \
+    course_list_key, get_version, store_course_detail, store_course_list, user_course_detail, user_course_list
+from materials.mixins import ConditionalGetMixin
 from materials.models import Course, Lesson
 from materials.paginators import MaterialsPagination
 from materials.permissions import IsOwnerOrStaff
-from materials.serializers import CourseSerializer, LessonSerializer, InfoLessonSerializer
-from materials.tasks import send_course_update_email
+from materials.serializers import CourseSerializer, LessonBulkSerializer, LessonSerializer, InfoLessonSerializer
+from materials.services import get_rate, schedule_course_update_email
+from subscription.models import Subscription
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для управления курсами.
 
@@ -24,6 +34,68 @@ class CourseViewSet(viewsets.ModelViewSet):
     pagination_class = MaterialsPagination
     lookup_field = 'id'
 
+    def get_queryset(self):
+        """
+        Аннотирует курсы признаком подписки текущего пользователя (`user_is_subscribed`),
+        чтобы страница списка не выполняла отдельный запрос на каждый курс.
+
+        Для детального просмотра уроки подгружаются одним запросом, а их количество
+        хранится в самом курсе (`lesson_count`).
+        """
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('lessons')
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                user_is_subscribed=Exists(Subscription.objects.filter(user=user, course=OuterRef('pk')))
+            )
+        return queryset
+
+    def cache_versions(self):
+        """
+        Версии кэша курсов и подписок пользователя: меняются при любом изменении ответа,
+        в том числе не обновляющем дату курса (счетчики, подписка, удаление).
+        """
+        user_id = self.request.user.pk
+        return user_id, get_version(COURSES_VERSION_KEY), get_version(SUBSCRIPTIONS_VERSION_KEY.format(user_id=user_id))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список курсов из кэша: общие поля курсов кэшируются для всех пользователей,
+        признак подписки подставляется из подписок текущего пользователя.
+
+        ETag строится по версиям кэша и курсу валют (`usd_price`) без запросов к БД.
+        """
+        usd_rate = get_rate('RUB', 'USD')
+        not_modified = self.conditional_response(request, None, *self.cache_versions(), usd_rate)
+        if not_modified:
+            return not_modified
+
+        key = course_list_key(request, usd_rate)
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            store_course_list(key, response.data)
+            return response
+        return Response(user_course_list(data, request.user))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Карточка курса из кэша (аналогично списку).
+        """
+        not_modified = self.conditional_response(request, None, *self.cache_versions())
+        if not_modified:
+            return not_modified
+
+        key = course_detail_key(self.kwargs[self.lookup_field])
+        data = cache.get(key)
+        if data is None:
+            response = super().retrieve(request, *args, **kwargs)
+            store_course_detail(key, response.data)
+            return response
+        return Response(user_course_detail(data, request.user))
+
     def get_serializer_class(self):
         """
         Возвращает нужный сериализатор в зависимости от типа запроса.
@@ -44,13 +116,13 @@ class CourseViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         """
         Переопределяем метод обновления, чтобы после обновления курса отправить email
-        подписанным пользователям
+        подписанным пользователям. Несколько обновлений подряд объединяются в одну рассылку.
         """
         # Сохраняем изменения курса
         course = serializer.save()
 
         # Отправляем email всем подписанным на курс пользователям
-        send_course_update_email.delay(course.id)
+        schedule_course_update_email(course.id)
 
 
 class LessonCreateAPIView(generics.CreateAPIView):
@@ -74,7 +146,48 @@ class LessonCreateAPIView(generics.CreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class LessonListAPIView(generics.ListAPIView):
+class LessonBulkAPIView(generics.GenericAPIView):
+    """
+    API для массового создания и обновления уроков одного курса (импорт).
+
+    Принимает список уроков; урок с `external_id`, который уже есть в курсе, обновляется.
+    С параметром `?partial=true` ошибочные элементы пропускаются и возвращаются в `errors`,
+    без него любая ошибка отклоняет весь список.
+
+    Доступ:
+    - Только владелец курса или администратор.
+
+    Метод:
+    - `post()`
+    """
+    queryset = Course.objects.all()
+    serializer_class = LessonBulkSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'course_id'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['partial_import'] = self.request.query_params.get('partial') in ('1', 'true')
+        return context
+
+    def post(self, request, *args, **kwargs):
+        course = self.get_object()
+        if not request.user.is_staff and course.owner_id != request.user.pk:
+            raise PermissionDenied('Импортировать уроки может только владелец курса.')
+
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False,
+                                         max_length=settings.LESSON_BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data:
+            return Response({'results': [], 'errors': serializer.item_errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            serializer.save(course=course, owner=request.user)
+        return Response({'results': serializer.results, 'errors': serializer.item_errors},
+                        status=status.HTTP_201_CREATED)
+
+
+class LessonListAPIView(ConditionalGetMixin, generics.ListAPIView):
     """
     API для получения списка уроков.
 
@@ -97,11 +210,21 @@ class LessonListAPIView(generics.ListAPIView):
         """
         user = self.request.user
         if user.is_staff:
-            return Lesson.objects.all()
-        return Lesson.objects.filter(owner=user)
+            return Lesson.objects.order_by('id')
+        return Lesson.objects.filter(owner=user).order_by('id')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список уроков с ETag по версии уроков и пользователю (без запросов к БД).
+        """
+        not_modified = self.conditional_response(request, None, request.user.pk, request.user.is_staff,
+                                                 get_version(LESSONS_VERSION_KEY))
+        if not_modified:
+            return not_modified
+        return super().list(request, *args, **kwargs)
 
-class LessonRetrieveAPIView(generics.RetrieveAPIView):
+
+class LessonRetrieveAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
     """        
     API для получения одного урока.
     
@@ -115,6 +238,16 @@ class LessonRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsOwnerOrStaff]
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Урок с ETag/Last-Modified по дате его последнего изменения.
+        """
+        lesson = self.get_object()
+        not_modified = self.conditional_response(request, lesson.last_updated_lesson, lesson.pk)
+        if not_modified:
+            return not_modified
+        return Response(self.get_serializer(lesson).data)
+
 
 class LessonUpdateAPIView(generics.UpdateAPIView):
     """
@@ -1,11 +1,54 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models
+from django.utils import timezone
 
 from materials.models import Course
 
 User = get_user_model()
 
 
+class SubscriptionManager(models.Manager):
+    """
+    Массовые подписка и отписка одним запросом.
+
+    Оба метода возвращают множество id курсов, строки которых действительно вставил
+    или удалил этот запрос (`RETURNING`): подписки, созданные или удаленные параллельным
+    запросом, и несуществующие курсы в результат не попадают. Сигналы модели не вызываются.
+    """
+
+    def _execute_returning(self, sql, params):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return {course_id for course_id, in cursor.fetchall()}
+
+    def subscribe_courses(self, user, course_ids):
+        # Строки берутся из таблицы курсов: несуществующие курсы пропускаются без ошибки внешнего ключа
+        if not course_ids:
+            return set()
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        created_at = self.model._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+        sql = (
+            f'INSERT INTO {quote(self.model._meta.db_table)} '
+            f'({quote("user_id")}, {quote("course_id")}, {quote("created_at")}) '
+            f'SELECT %s, {quote(Course._meta.pk.column)}, %s FROM {quote(Course._meta.db_table)} '
+            f'WHERE {quote(Course._meta.pk.column)} IN ({", ".join(["%s"] * len(course_ids))}) '
+            f'ON CONFLICT ({quote("user_id")}, {quote("course_id")}) DO NOTHING RETURNING {quote("course_id")}'
+        )
+        return self._execute_returning(sql, [user.pk, created_at, *course_ids])
+
+    def unsubscribe_courses(self, user, course_ids):
+        if not course_ids:
+            return set()
+        quote = connections[self.db].ops.quote_name
+        sql = (
+            f'DELETE FROM {quote(self.model._meta.db_table)} '
+            f'WHERE {quote("user_id")} = %s AND {quote("course_id")} IN ({", ".join(["%s"] * len(course_ids))}) '
+            f'RETURNING {quote("course_id")}'
+        )
+        return self._execute_returning(sql, [user.pk, *course_ids])
+
+
 class Subscription(models.Model):
     """
     Подписка пользователя на курс.
@@ -24,8 +67,14 @@ class Subscription(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SubscriptionManager()
+
     class Meta:
         unique_together = ('user', 'course') #Запрет на дублирование подписок
+        indexes = [
+            # Подписчики курса (рассылки); unique_together покрывает только поиск по пользователю
+            models.Index(fields=['course', 'user'], name='subscription_course_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} -> {self.course.name}"
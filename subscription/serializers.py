@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from config.exports import ExportQuerySerializer
+from materials.models import Course
 from subscription.models import Subscription
 
 
@@ -7,3 +9,31 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = ['user', 'course']
+
+
+class SubscriptionBulkSerializer(serializers.Serializer):
+    """
+    Массовая подписка на курсы или отписка от них.
+
+    Все id курсов проверяются одним запросом (`existing_course_ids` в `validated_data`);
+    несуществующие курсы не прерывают операцию, а попадают в результат со статусом `not_found`.
+    """
+    SUBSCRIBE = 'subscribe'
+    UNSUBSCRIBE = 'unsubscribe'
+
+    courses = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=100)
+    action = serializers.ChoiceField(choices=[SUBSCRIBE, UNSUBSCRIBE], default=SUBSCRIBE)
+
+    def validate_courses(self, value):
+        return list(dict.fromkeys(value))  # Без повторов, в порядке запроса
+
+    def validate(self, attrs):
+        attrs['existing_course_ids'] = set(
+            Course.objects.filter(id__in=attrs['courses']).values_list('id', flat=True)
+        )
+        return attrs
+
+
+class SubscriptionExportQuerySerializer(ExportQuerySerializer):
+    """Параметры выгрузки подписок: `course` ограничивает выгрузку одним курсом"""
+    course = serializers.IntegerField(min_value=1, required=False)
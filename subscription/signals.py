@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from materials.cache import invalidate_courses, invalidate_user_subscriptions
+from materials.signals import change_course_counter
+from subscription.models import Subscription
+
+
+@receiver(post_save, sender=Subscription)
+def count_saved_subscription(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_course_counter(instance.course_id, 'subscriber_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def count_deleted_subscription(sender, instance, **kwargs):
+    change_course_counter(instance.course_id, 'subscriber_count', -1)
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_subscription_cache(sender, instance, **kwargs):
+    # Меняется счетчик подписчиков курса и список подписок пользователя
+    invalidate_courses()
+    invalidate_user_subscriptions(instance.user_id)
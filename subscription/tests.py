@@ -1,7 +1,12 @@
+import json
+import threading
+from unittest import skipIf
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 
 from materials.models import Course
 from subscription.models import Subscription
@@ -48,3 +53,140 @@ class SubscriptionTestCase(APITestCase):
 
         # Проверяем, что подписка была удалена
         self.assertEqual(Subscription.objects.filter(user=self.user, course=self.course).count(), 0)
+
+    def test_toggle_queries(self):
+        """Подписка и отписка выполняются одиночными запросами с RETURNING и меняют счетчик"""
+        url = reverse('subscription:subscribe', kwargs={'course_id': self.course.id})
+
+        # SAVEPOINT, DELETE ... RETURNING, INSERT ... RETURNING, обновление счетчика, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            self.client.post(url)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.subscriber_count, 1)
+
+        # SAVEPOINT, DELETE ... RETURNING, обновление счетчика, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            self.client.post(url)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.subscriber_count, 0)
+
+    def test_missing_course(self):
+        """Подписка на несуществующий курс возвращает 404"""
+        response = self.client.post(reverse('subscription:subscribe', kwargs={'course_id': self.course.id + 1}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Subscription.objects.exists())
+
+
+class SubscriptionBulkTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.client.force_authenticate(user=self.user)
+        self.courses = [Course.objects.create(name=f"Course {number}") for number in range(3)]
+        self.url = reverse('subscription:subscribe-bulk')
+
+    def test_bulk_subscribe(self):
+        """Массовая подписка возвращает результат по каждому курсу и обновляет счетчики"""
+        first, second, third = self.courses
+        Subscription.objects.create(user=self.user, course=first)
+        missing_id = third.id + 1
+
+        # проверка курсов, SAVEPOINT, INSERT ... RETURNING, обновление счетчиков, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {'courses': [first.id, second.id, third.id, missing_id, second.id]},
+                                        format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [
+            {'course': first.id, 'status': 'already_subscribed'},
+            {'course': second.id, 'status': 'added'},
+            {'course': third.id, 'status': 'added'},
+            {'course': missing_id, 'status': 'not_found'},
+        ])
+        self.assertEqual(Subscription.objects.filter(user=self.user).count(), 3)
+        self.assertEqual([Course.objects.get(pk=course.pk).subscriber_count for course in self.courses], [1, 1, 1])
+
+    def test_bulk_unsubscribe(self):
+        """Массовая отписка удаляет подписки одним запросом"""
+        first, second, third = self.courses
+        Subscription.objects.create(user=self.user, course=first)
+        Subscription.objects.create(user=self.user, course=second)
+
+        # проверка курсов, SAVEPOINT, DELETE ... RETURNING, обновление счетчиков, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {'courses': [first.id, second.id, third.id],
+                                                   'action': 'unsubscribe'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.json()['results']],
+                         ['removed', 'removed', 'not_subscribed'])
+        self.assertFalse(Subscription.objects.filter(user=self.user).exists())
+        self.assertEqual([Course.objects.get(pk=course.pk).subscriber_count for course in self.courses], [0, 0, 0])
+
+    def test_bulk_invalid(self):
+        """Пустой список курсов и неизвестное действие отклоняются"""
+        response = self.client.post(self.url, {'courses': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {'courses': [self.courses[0].id], 'action': 'toggle'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SubscriptionExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@fob.ru', password='Poma2404', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.course = Course.objects.create(name="Advanced Django")
+        other_course = Course.objects.create(name="Python")
+        Subscription.objects.create(user=self.admin, course=self.course)
+        Subscription.objects.create(user=self.admin, course=other_course)
+        self.url = reverse('subscription:subscription-export')
+
+    def test_export(self):
+        """Подписки выгружаются потоком в NDJSON с фильтром по курсу"""
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'course': self.course.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['user__email'], row['course__name']) for row in rows],
+                         [('admin@fob.ru', 'Advanced Django')])
+
+        response = self.client.get(self.url, {'course': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite блокирует таблицу при параллельной записи')
+class SubscriptionConcurrencyTestCase(APITransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.course = Course.objects.create(name="Advanced Django")
+        self.url = reverse('subscription:subscribe', kwargs={'course_id': self.course.id})
+
+    def test_double_tap(self):
+        """Одновременные запросы на подписку не приводят к ошибкам 500 и рассинхронизации счетчика"""
+        threads_count = 4
+        barrier = threading.Barrier(threads_count)
+        statuses = []
+
+        def toggle():
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            barrier.wait()
+            try:
+                statuses.append(client.post(self.url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=toggle) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(statuses), threads_count)
+        self.assertTrue(all(code in (status.HTTP_200_OK, status.HTTP_201_CREATED) for code in statuses), statuses)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.subscriber_count, Subscription.objects.filter(course=self.course).count())
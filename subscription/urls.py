@@ -1,10 +1,12 @@
 from django.urls import path
 
 from subscription.apps import SubscriptionConfig
-from subscription.views import SubscriptionView
+from subscription.views import SubscriptionBulkView, SubscriptionExportView, SubscriptionView
 
 app_name = SubscriptionConfig.name
 
 urlpatterns = [
     path('subscribe/<int:course_id>/', SubscriptionView.as_view(), name='subscribe'),  # Эндпоинт для подписки
+    path('subscribe/bulk/', SubscriptionBulkView.as_view(), name='subscribe-bulk'),  # Подписка на несколько курсов
+    path('export/', SubscriptionExportView.as_view(), name='subscription-export'),  # Выгрузка подписок
 ]
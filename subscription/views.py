@@ -1,10 +1,15 @@
+from django.db import transaction
 from rest_framework import status  # Добавьте этот импорт
-from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from config.exports import stream_export
+from materials.cache import invalidate_courses, invalidate_user_subscriptions
 from materials.models import Course
+from materials.signals import change_courses_counter
 from subscription.models import Subscription
+from subscription.serializers import SubscriptionBulkSerializer, SubscriptionExportQuerySerializer
 
 
 class SubscriptionView(APIView):
@@ -19,14 +24,88 @@ class SubscriptionView(APIView):
         user = request.user  # Получаем текущего пользователя
         if not user.is_authenticated:
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
-        course = get_object_or_404(Course, id=course_id)
-        subscription_exists = Subscription.objects.filter(user=user, course=course).exists()
 
-        if subscription_exists:
-            # Если подписка уже существует, удаляем её
-            Subscription.objects.filter(user=user, course=course).delete()
+        # Удаление и вставка — отдельные запросы с RETURNING: счетчик меняется только по строке,
+        # которую изменил именно этот запрос
+        with transaction.atomic():
+            removed = Subscription.objects.unsubscribe_courses(user, [course_id])
+            if removed:
+                change_courses_counter(removed, 'subscriber_count', -1)
+                added = set()
+            else:
+                added = Subscription.objects.subscribe_courses(user, [course_id])
+                change_courses_counter(added, 'subscriber_count', 1)
+
+        if removed or added:
+            invalidate_courses()
+            invalidate_user_subscriptions(user.pk)
+        if removed:
             return Response({"message": "Subscription removed."}, status=status.HTTP_200_OK)
-        else:
-            # Если подписки нет, создаем новую
-            Subscription.objects.create(user=user, course=course)
-            return Response({"message": "Subscription added."}, status=status.HTTP_201_CREATED)
+        # Ничего не вставлено: курса нет или подписку одновременно создал параллельный запрос
+        if not added and not Course.objects.filter(id=course_id).exists():
+            return Response({"detail": "No Course matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"message": "Subscription added."}, status=status.HTTP_201_CREATED)
+
+
+class SubscriptionBulkView(APIView):
+    """
+    APIView для массовой подписки на курсы и отписки от них.
+
+    Принимает `{"courses": [id, ...], "action": "subscribe" | "unsubscribe"}`
+    и возвращает результат по каждому курсу: `added`, `already_subscribed`,
+    `removed`, `not_subscribed` или `not_found`.
+    """
+
+    def post(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        serializer = SubscriptionBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_ids = serializer.validated_data['courses']
+        existing_course_ids = serializer.validated_data['existing_course_ids']
+        found_ids = [course_id for course_id in course_ids if course_id in existing_course_ids]
+
+        # Статусы и счетчики считаются по строкам, которые действительно вставил или удалил этот запрос
+        with transaction.atomic():
+            if serializer.validated_data['action'] == SubscriptionBulkSerializer.SUBSCRIBE:
+                changed_ids = Subscription.objects.subscribe_courses(user, found_ids)
+                change_courses_counter(changed_ids, 'subscriber_count', 1)
+                changed_status, unchanged_status = 'added', 'already_subscribed'
+            else:
+                changed_ids = Subscription.objects.unsubscribe_courses(user, found_ids)
+                change_courses_counter(changed_ids, 'subscriber_count', -1)
+                changed_status, unchanged_status = 'removed', 'not_subscribed'
+
+        if changed_ids:
+            invalidate_courses()
+            invalidate_user_subscriptions(user.pk)
+
+        results = [
+            {
+                'course': course_id,
+                'status': 'not_found' if course_id not in existing_course_ids
+                else changed_status if course_id in changed_ids else unchanged_status,
+            }
+            for course_id in course_ids
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class SubscriptionExportView(APIView):
+    """
+    Потоковая выгрузка подписок в CSV или NDJSON (`?export_format=`), `?course=` ограничивает курсом.
+    Доступ только для администраторов.
+    """
+    permission_classes = [IsAdminUser]
+    fields = ['id', 'user_id', 'user__email', 'course_id', 'course__name', 'created_at']
+
+    def get(self, request):
+        serializer = SubscriptionExportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        subscriptions = Subscription.objects.order_by('id')
+        course_id = serializer.validated_data.get('course')
+        if course_id:
+            subscriptions = subscriptions.filter(course_id=course_id)
+        return stream_export(subscriptions, self.fields, serializer.validated_data['export_format'], 'subscriptions')
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from users.models import RollupWatermark
+from users.reports import PAYMENT_ROLLUP, backfill_payment_rollups, last_payment_change
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводную таблицу выручки по платежам частями по несколько дней'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date.fromisoformat,
+                            help='Первый день (ГГГГ-ММ-ДД), по умолчанию день первого платежа')
+        parser.add_argument('--date-to', type=date.fromisoformat, help='Последний день, по умолчанию сегодня')
+        parser.add_argument('--chunk-days', type=int, help='Количество дней в одной транзакции')
+
+    def handle(self, *args, **options):
+        # Отметка снимается до пересборки: платежи, измененные во время нее, пересчитает инкрементальная задача
+        last_change = last_payment_change()
+        total = 0
+        for day_from, day_to, rows in backfill_payment_rollups(options['date_from'], options['date_to'],
+                                                               options['chunk_days']):
+            total += rows
+            self.stdout.write(f'{day_from} - {day_to}: {rows}')
+
+        if options['date_to'] is None and last_change is not None:
+            # Таблица собрана до текущего момента: инкрементальная задача продолжит с этой отметки
+            RollupWatermark.objects.update_or_create(name=PAYMENT_ROLLUP, defaults={'value': last_change})
+        self.stdout.write(self.style.SUCCESS(f'Строк в сводной таблице: {total}'))
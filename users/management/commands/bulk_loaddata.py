@@ -0,0 +1,214 @@
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import IntegrityError, connection, transaction
+from django.db.models import DateTimeField
+from django.utils import timezone
+
+from materials.cache import invalidate_courses, invalidate_lessons, invalidate_user_subscriptions
+from materials.models import Lesson
+from materials.validators import get_video_link_extractor
+from subscription.models import Subscription
+from users.bulk import bulk_create_with_dates
+
+READ_SIZE = 64 * 1024
+# Между объектами: пробелы и переводы строк (JSONL) либо скобки и запятые массива (JSON)
+SEPARATORS = re.compile(r'[\s\[\],]*')
+
+
+def iter_json_objects(stream, read_size=READ_SIZE):
+    """
+    Потоковый разбор файла с JSON-массивом объектов или JSONL.
+
+    В памяти находятся только буфер чтения и текущий объект.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                continue
+        elif eof:
+            return
+        # Буфер закончился или объект не поместился в него целиком: дочитываем
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def fixture_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(file for file in path.iterdir() if file.suffix in ('.json', '.jsonl')))
+        elif path.exists():
+            files.append(path)
+        else:
+            raise CommandError(f'Файл не найден: {path}')
+    return files
+
+
+def get_model(label, path):
+    try:
+        return apps.get_model(label)
+    except (LookupError, ValueError):
+        raise CommandError(f'{path}: неизвестная модель "{label}"')
+
+
+def dependency_depth(model, seen=()):
+    """Глубина модели в графе внешних ключей: пользователи 0, курсы 1, уроки 2, платежи 3"""
+    depths = [
+        dependency_depth(field.related_model, (*seen, model)) + 1
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model is not model and field.related_model not in seen
+    ]
+    return max(depths, default=0)
+
+
+def read_records(path, stream):
+    try:
+        yield from iter_json_objects(stream)
+    except json.JSONDecodeError as e:
+        raise CommandError(f'{path}: некорректный JSON: {e}')
+
+
+def first_model(path):
+    with open(path, encoding='utf-8') as stream:
+        record = next(read_records(path, stream), None)
+    return None if record is None else get_model(record.get('model', ''), path)
+
+
+def make_naive_datetimes(model, objs):
+    """Без USE_TZ база не принимает даты с часовым поясом (например, "2025-02-01T12:00:00Z")"""
+    if settings.USE_TZ:
+        return
+    fields = [field for field in model._meta.concrete_fields if isinstance(field, DateTimeField)]
+    for obj in objs:
+        for field in fields:
+            value = getattr(obj, field.attname)
+            if value is not None and timezone.is_aware(value):
+                setattr(obj, field.attname, timezone.make_naive(value))
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает фикстуры (JSON или JSONL) через bulk_create пачками: '
+            'пользователи, затем курсы, уроки, платежи и подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Файлы или каталоги, по умолчанию fixtures/')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Объектов в одном INSERT и транзакции')
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='Пропускать объекты, которые уже есть в базе')
+        parser.add_argument('--ignorenonexistent', '-i', action='store_true',
+                            help='Пропускать поля, которых нет в модели')
+
+    def handle(self, *args, **options):
+        files = fixture_files(options['paths'] or [settings.BASE_DIR / 'fixtures'])
+        # Файлы загружаются в порядке зависимостей модели первого объекта
+        ordered = sorted(
+            ((dependency_depth(model), path) for path in files if (model := first_model(path)) is not None),
+            key=lambda item: item[0],
+        )
+
+        started = time.monotonic()
+        loaded = Counter()
+        # Пользователи загруженных подписок: их закэшированные списки подписок устарели
+        self.subscription_user_ids = set()
+        for _, path in ordered:
+            with open(path, encoding='utf-8') as stream:
+                for model, count in self.load_stream(path, stream, options):
+                    loaded[model] += count
+
+        self.finish(loaded)
+        for model, count in loaded.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(loaded.values())} за {time.monotonic() - started:.1f} с'
+        ))
+
+    def load_stream(self, path, stream, options):
+        """Читает объекты файла пачками по `batch_size` одной модели и выдает (модель, количество)"""
+        batch, batch_model, number = [], None, 1
+        for record in read_records(path, stream):
+            model = get_model(record.get('model', ''), path)
+            if batch and (model is not batch_model or len(batch) >= options['batch_size']):
+                yield batch_model, self.insert(batch_model, batch, path, number, options)
+                batch, number = [], number + 1
+            batch.append(record)
+            batch_model = model
+        if batch:
+            yield batch_model, self.insert(batch_model, batch, path, number, options)
+
+    def insert(self, model, records, path, number, options):
+        try:
+            deserialized = list(PythonDeserializer(records, ignorenonexistent=options['ignorenonexistent']))
+        except DeserializationError as e:
+            raise CommandError(f'{path}: {e}')
+
+        objs = [item.object for item in deserialized]
+        make_naive_datetimes(model, objs)
+        if model is Lesson:
+            # Lesson.save() не вызывается, id видео заполняются здесь
+            extractor = get_video_link_extractor()
+            for lesson in objs:
+                lesson.video_ids = extractor.extract_video_ids(lesson.description)
+        if model is Subscription:
+            self.subscription_user_ids.update(obj.user_id for obj in objs)
+
+        try:
+            with transaction.atomic():
+                bulk_create_with_dates(model, objs, ignore_conflicts=options['ignore_conflicts'])
+                self.insert_m2m(deserialized, options)
+        except IntegrityError as e:
+            # Предыдущие пачки уже сохранены: сообщаем, с какого места продолжить
+            raise CommandError(f'{path}: пачка {number} ({model._meta.label}, объектов {len(objs)}) не загружена: {e}. '
+                               f'Предыдущие пачки сохранены; чтобы пропустить существующие объекты, '
+                               f'используйте --ignore-conflicts')
+        return len(objs)
+
+    @staticmethod
+    def insert_m2m(deserialized, options):
+        through_rows = {}
+        for item in deserialized:
+            for name, values in (item.m2m_data or {}).items():
+                field = item.object._meta.get_field(name)
+                through = field.remote_field.through
+                source, target = field.m2m_column_name(), field.m2m_reverse_name()
+                through_rows.setdefault(through, []).extend(
+                    through(**{source: item.object.pk, target: value}) for value in values
+                )
+        for through, rows in through_rows.items():
+            through._base_manager.bulk_create(rows, ignore_conflicts=options['ignore_conflicts'])
+
+    def finish(self, loaded):
+        """Сбрасывает последовательности id и пересчитывает данные, которые обычно поддерживают сигналы"""
+        if not loaded:
+            return
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), list(loaded))
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+
+        call_command('reconcile_course_counters', stdout=self.stdout)
+        invalidate_courses()
+        invalidate_lessons()
+        for user_id in self.subscription_user_ids:
+            invalidate_user_subscriptions(user_id)
@@ -0,0 +1,149 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from materials.cache import invalidate_courses, invalidate_lessons, invalidate_user_subscriptions
+from materials.models import Course, Lesson
+from subscription.models import Subscription
+from users.bulk import bulk_create_with_dates
+from users.models import Payment, User
+
+PASSWORD = 'loadtest'
+CITIES = ['Москва', 'Санкт-Петербург', 'Новосибирск', 'Екатеринбург', 'Казань', 'Нижний Новгород']
+COURSE_PRICES = [990, 1990, 2990, 4990, 9990]
+LESSON_PRICES = [190, 290, 490, 990]
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса распределения Ципфа: первые элементы выбираются намного чаще остальных"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетических пользователей, курсы, уроки, подписки и платежи '
+            'с неравномерной популярностью курсов и активностью пользователей')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=100)
+        parser.add_argument('--lessons-per-course', type=int, default=10, help='Среднее количество уроков в курсе')
+        parser.add_argument('--subscriptions', type=int, default=5000)
+        parser.add_argument('--payments', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365, help='За сколько последних дней распределяются даты')
+        parser.add_argument('--skew', type=float, default=1.1, help='Показатель распределения Ципфа')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--prefix', default='load', help='Префикс email синтетических пользователей')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        skew = options['skew']
+        prefix = options['prefix']
+
+        if User.objects.filter(email__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Пользователи с префиксом "{prefix}" уже есть, укажите другой --prefix')
+        if options['subscriptions'] > options['users'] * options['courses'] // 2:
+            # Уникальные пары при неравномерном выборе находятся тем дольше, чем ближе их число к максимуму
+            raise CommandError('Подписок должно быть не больше половины возможных пар пользователь-курс')
+
+        started = time.monotonic()
+        password = make_password(PASSWORD)  # Хэш вычисляется один раз для всех пользователей
+        user_ids = self.insert(User, (
+            User(email=f'{prefix}-{number}@example.test', password=password, city=self.random.choice(CITIES),
+                 date_joined=self.past())
+            for number in range(options['users'])
+        ))
+        courses = self.insert_objects(Course, (
+            Course(name=f'Курс {number}', description=f'Описание курса {number}',
+                   amount=self.random.choice(COURSE_PRICES), owner_id=self.random.choice(user_ids))
+            for number in range(options['courses'])
+        ))
+        course_ids = [course.pk for course in courses]
+        course_amounts = {course.pk: course.amount for course in courses}
+
+        lessons = []
+        for course_id in course_ids:
+            for number in range(max(1, round(self.random.expovariate(1 / options['lessons_per_course'])))):
+                video_id = f'{self.random.getrandbits(64):011x}'[:11]
+                lessons.append(Lesson(
+                    name=f'Урок {number}', course_id=course_id, amount=self.random.choice(LESSON_PRICES),
+                    description=f'Разбор темы {number}: https://www.youtube.com/watch?v={video_id}',
+                    video_ids=[video_id], external_id=f'synthetic-{course_id}-{number}',
+                ))
+        lesson_rows = [(lesson.pk, lesson.amount) for lesson in self.insert_objects(Lesson, lessons)]
+
+        # Популярность курсов и активность пользователей по Ципфу (порядок случайный)
+        self.random.shuffle(course_ids)
+        self.random.shuffle(user_ids)
+        course_weights = zipf_weights(len(course_ids), skew)
+        user_weights = zipf_weights(len(user_ids), skew)
+
+        pairs = set()
+        while len(pairs) < options['subscriptions']:
+            pairs.add((self.pick(user_ids, user_weights), self.pick(course_ids, course_weights)))
+        self.insert(Subscription, (
+            Subscription(user_id=user_id, course_id=course_id, created_at=self.past()) for user_id, course_id in pairs
+        ))
+
+        def payments():
+            for _ in range(options['payments']):
+                payment = Payment(user_id=self.pick(user_ids, user_weights), data_pay=self.past(),
+                                  payment_method=self.random.choice(['cash', 'transfer']),
+                                  status=self.random.choices(['ready', 'pending', 'failed'], [90, 5, 5])[0])
+                if lesson_rows and self.random.random() < 0.2:
+                    payment.pay_lesson_id, payment.amount = self.random.choice(lesson_rows)
+                else:
+                    payment.pay_course_id = self.pick(course_ids, course_weights)
+                    payment.amount = course_amounts[payment.pay_course_id]
+                yield payment
+        self.insert(Payment, payments())
+
+        call_command('reconcile_course_counters', stdout=self.stdout)
+        invalidate_courses()
+        invalidate_lessons()
+        for user_id in {user_id for user_id, _ in pairs}:
+            invalidate_user_subscriptions(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(user_ids)}, курсов {len(course_ids)}, уроков {len(lesson_rows)}, '
+            f'подписок {len(pairs)}, платежей {options["payments"]} за {time.monotonic() - started:.1f} с. '
+            f'Пароль пользователей: {PASSWORD}'
+        ))
+
+    def past(self):
+        """Дата за последние `days` дней, ближе к текущей чаще"""
+        return self.now - timedelta(days=min(self.random.expovariate(3 / self.days), self.days))
+
+    def pick(self, items, cum_weights):
+        return self.random.choices(items, cum_weights=cum_weights)[0]
+
+    def insert(self, model, objs):
+        """Вставляет объекты пачками и возвращает их id"""
+        return [obj.pk for obj in self.insert_objects(model, objs)]
+
+    def insert_objects(self, model, objs):
+        inserted, batch = [], []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                inserted.extend(self.insert_batch(model, batch))
+                batch = []
+        if batch:
+            inserted.extend(self.insert_batch(model, batch))
+        return inserted
+
+    @staticmethod
+    def insert_batch(model, batch):
+        # bulk_create не вызывает сигналы: счетчики курсов пересчитываются в конце
+        with transaction.atomic():
+            return bulk_create_with_dates(model, batch)
+
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_managers_payment_delete_pay'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает создания сессии'), ('ready', 'Сессия создана'), ('failed', 'Ошибка создания сессии')], default='ready', help_text='Состояние создания сессии оплаты в Stripe.', max_length=10, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0007_course_lesson_stripe_ids'),
+        ('users', '0005_payment_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user', 'data_pay', 'id'], name='payment_user_data_pay_idx'),
+        ),
+    ]
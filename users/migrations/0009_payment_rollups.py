@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0011_lesson_video_ids'),
+        ('users', '0008_payment_user_amount_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Сводная таблица')),
+                ('value', models.DateTimeField(blank=True, null=True, verbose_name='Обработано до')),
+            ],
+            options={
+                'verbose_name': 'Отметка сводной таблицы',
+                'verbose_name_plural': 'Отметки сводных таблиц',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличные'), ('transfer', 'Перевод')], max_length=10, verbose_name='Способ оплаты')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('purchases', models.PositiveIntegerField(default=0, verbose_name='Количество покупок')),
+                ('pay_course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='materials.course', verbose_name='Курс')),
+                ('pay_lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='materials.lesson', verbose_name='Урок')),
+            ],
+            options={
+                'verbose_name': 'Выручка за день',
+                'verbose_name_plural': 'Выручка по дням',
+                'indexes': [models.Index(fields=['day'], name='payment_rollup_day_idx'), models.Index(fields=['pay_course', 'day'], name='payment_rollup_course_day_idx')],
+            },
+        ),
+    ]
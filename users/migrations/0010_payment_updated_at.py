@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    # Существующие платежи уже учтены в сводной таблице по дате оплаты
+    Payment = apps.get_model('users', 'Payment')
+    Payment.objects.update(updated_at=models.F('data_pay'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0011_lesson_video_ids'),
+        ('users', '0009_payment_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Дата и время последнего изменения платежа (для пересчета сводной таблицы).', verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='data_pay',
+            field=models.DateTimeField(auto_now_add=True, help_text='Дата и время совершения оплаты.', verbose_name='Дата оплаты'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['updated_at'], name='payment_updated_at_idx'),
+        ),
+    ]
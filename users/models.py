@@ -68,6 +68,10 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            # Поиск неактивных пользователей для деактивации: только среди активных
+            models.Index(fields=['last_login'], condition=models.Q(is_active=True), name='user_active_last_login_idx'),
+        ]
 
 
 class Payment(models.Model):
@@ -78,6 +82,11 @@ class Payment(models.Model):
         ('cash', 'Наличные'),
         ('transfer', 'Перевод'),
     ]
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает создания сессии'),
+        ('ready', 'Сессия создана'),
+        ('failed', 'Ошибка создания сессии'),
+    ]
 
     user = models.ForeignKey(
         User,
@@ -87,7 +96,7 @@ class Payment(models.Model):
         help_text='Пользователь, который осуществил покупку.'
     )
     data_pay = models.DateTimeField(
-        auto_now=True,
+        auto_now_add=True,
         verbose_name='Дата оплаты',
         help_text='Дата и время совершения оплаты.'
     )
@@ -135,6 +144,18 @@ class Payment(models.Model):
         help_text='Укажите ссылку на оплату',
         **NULLABLE
     )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='ready',
+        verbose_name='Статус',
+        help_text='Состояние создания сессии оплаты в Stripe.'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Дата и время последнего изменения платежа (для пересчета сводной таблицы).'
+    )
 
     def __str__(self):
         return f"Оплата {self.amount} за {self.pay_course or self.pay_lesson}"
@@ -142,3 +163,84 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Оплата'
         verbose_name_plural = 'Оплата'
+        indexes = [
+            # История платежей пользователя с сортировкой по дате (курсорная пагинация)
+            models.Index(fields=['user', 'data_pay', 'id'], name='payment_user_data_pay_idx'),
+            # Фильтр истории платежей по диапазону суммы
+            models.Index(fields=['user', 'amount'], name='payment_user_amount_idx'),
+            # Платежи, измененные после прошлого пересчета сводной таблицы
+            models.Index(fields=['updated_at'], name='payment_updated_at_idx'),
+        ]
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    Выручка и количество покупок за день в разрезе курса, урока и способа оплаты.
+
+    Заполняется из `Payment` задачей `refresh_payment_rollups` и командой `backfill_payment_rollups`.
+    """
+    day = models.DateField(
+        verbose_name='День'
+    )
+    pay_course = models.ForeignKey(
+        Course,
+        **NULLABLE,
+        on_delete=models.CASCADE,
+        related_name='payment_rollups',
+        verbose_name='Курс'
+    )
+    pay_lesson = models.ForeignKey(
+        Lesson,
+        **NULLABLE,
+        on_delete=models.CASCADE,
+        related_name='payment_rollups',
+        verbose_name='Урок'
+    )
+    payment_method = models.CharField(
+        max_length=10,
+        choices=Payment.PAYMENT_METHOD_CHOICES,
+        verbose_name='Способ оплаты'
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Выручка'
+    )
+    purchases = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество покупок'
+    )
+
+    def __str__(self):
+        return f"{self.day}: {self.revenue} ({self.purchases})"
+
+    class Meta:
+        verbose_name = 'Выручка за день'
+        verbose_name_plural = 'Выручка по дням'
+        indexes = [
+            models.Index(fields=['day'], name='payment_rollup_day_idx'),
+            models.Index(fields=['pay_course', 'day'], name='payment_rollup_course_day_idx'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """
+    Отметка, до которой данные уже перенесены в сводную таблицу.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Сводная таблица'
+    )
+    value = models.DateTimeField(
+        **NULLABLE,
+        verbose_name='Обработано до'
+    )
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    class Meta:
+        verbose_name = 'Отметка сводной таблицы'
+        verbose_name_plural = 'Отметки сводных таблиц'
@@ -1,7 +1,68 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class UsersPagination(PageNumberPagination):
     page_size = 5
     page_query_param = 'page_size'
     max_page_size = 10
+
+
+class CountFreeLimitOffsetPagination(LimitOffsetPagination):
+    """
+    LimitOffset без COUNT(*): выбирается на одну запись больше лимита,
+    чтобы понять, есть ли следующая страница.
+    """
+    default_limit = 100
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class PaymentPagination(CursorPagination):
+    """
+    Пагинация истории платежей без COUNT(*).
+
+    По умолчанию курсорная: страница выбирается по условию на (data_pay, id) и использует
+    индекс (user, data_pay, id). С параметром `?offset=` используется LimitOffset без подсчета.
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-data_pay', '-id')
+    offset_mode_query_param = 'offset'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.offset_paginator = None
+        if self.offset_mode_query_param in request.query_params:
+            self.offset_paginator = CountFreeLimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,155 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from users.models import Payment, PaymentDailyRollup, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_ROLLUP = 'payment_daily'
+
+# Группировка временного ряда отчета
+PERIODS = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min)
+
+
+def rebuild_payment_rollups(day_from, day_to):
+    """
+    Пересчитывает сводную таблицу за дни с `day_from` по `day_to` включительно.
+
+    Строки за эти дни удаляются и собираются заново одним агрегирующим запросом,
+    поэтому повторный пересчет тех же дней безопасен. Учитываются только платежи со статусом `ready`.
+    Возвращает количество созданных строк.
+    """
+    rows = (
+        Payment.objects
+        .filter(data_pay__gte=_day_start(day_from), data_pay__lt=_day_start(day_to + timedelta(days=1)),
+                status='ready')
+        .annotate(day=TruncDate('data_pay'))
+        .values('day', 'pay_course', 'pay_lesson', 'payment_method')
+        .annotate(revenue=Sum('amount'), purchases=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        PaymentDailyRollup.objects.filter(day__gte=day_from, day__lte=day_to).delete()
+        created = PaymentDailyRollup.objects.bulk_create([
+            PaymentDailyRollup(
+                day=row['day'],
+                pay_course_id=row['pay_course'],
+                pay_lesson_id=row['pay_lesson'],
+                payment_method=row['payment_method'],
+                revenue=row['revenue'],
+                purchases=row['purchases'],
+            )
+            for row in rows
+        ])
+    return len(created)
+
+
+def last_payment_change():
+    """Время последнего изменения платежей (`updated_at`) — отметка, до которой данные учтены"""
+    return Payment.objects.aggregate(value=Max('updated_at'))['value']
+
+
+def _day_ranges(days, chunk_days):
+    """Группирует отсортированные дни в непрерывные диапазоны не длиннее `chunk_days` дней"""
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1) and (day - ranges[-1][0]).days < chunk_days:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def refresh_payment_rollups():
+    """
+    Инкрементально пересчитывает дни, в которых есть платежи, измененные после прошлого запуска.
+
+    Измененные платежи ищутся по `updated_at` (создание, смена статуса, суммы и т.д.), а пересчитываются
+    дни их оплаты `data_pay`, какими бы старыми они ни были. Отметка — наибольший `updated_at`
+    обработанных платежей; поиск начинается с (отметка - `PAYMENT_ROLLUP_LAG`), чтобы учесть транзакции,
+    зафиксированные позже. Параллельные запуски выполняются по очереди благодаря блокировке строки отметки.
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=PAYMENT_ROLLUP)
+        high = last_payment_change()
+        changed = Payment.objects.all()
+        if watermark.value is not None:
+            changed = changed.filter(updated_at__gt=watermark.value - settings.PAYMENT_ROLLUP_LAG)
+        if high is not None:
+            changed = changed.filter(updated_at__lte=high)
+        days = changed.annotate(day=TruncDate('data_pay')).values_list('day', flat=True).distinct().order_by('day')
+
+        rows = 0
+        for day_from, day_to in _day_ranges(days, settings.PAYMENT_ROLLUP_CHUNK_DAYS):
+            rows += rebuild_payment_rollups(day_from, day_to)
+
+        if high is not None and (watermark.value is None or high > watermark.value):
+            watermark.value = high
+            watermark.save(update_fields=['value'])
+
+    logger.info('Сводная таблица платежей обновлена до %s, строк: %s', watermark.value, rows)
+    return {'watermark': watermark.value.isoformat() if watermark.value else None, 'rows': rows}
+
+
+def backfill_payment_rollups(day_from=None, day_to=None, chunk_days=None):
+    """
+    Полностью пересобирает сводную таблицу частями по `chunk_days` дней (каждая часть в своей транзакции).
+
+    Без границ пересобирается весь период от первого платежа до сегодняшнего дня.
+    Выдает (первый день, последний день, строк) для каждой обработанной части.
+    """
+    chunk_days = chunk_days or settings.PAYMENT_ROLLUP_CHUNK_DAYS
+    if day_from is None:
+        first_payment = Payment.objects.order_by('data_pay').values_list('data_pay', flat=True).first()
+        if first_payment is None:
+            return
+        day_from = first_payment.date()
+    day_to = day_to or timezone.now().date()
+
+    while day_from <= day_to:
+        chunk_end = min(day_from + timedelta(days=chunk_days - 1), day_to)
+        yield day_from, chunk_end, rebuild_payment_rollups(day_from, chunk_end)
+        day_from = chunk_end + timedelta(days=1)
+
+
+def revenue_report(date_from=None, date_to=None, period='day', course=None, lesson=None, payment_method=None):
+    """
+    Итоги и временной ряд выручки по сводной таблице (без обращения к таблице платежей).
+    """
+    rollups = PaymentDailyRollup.objects.all()
+    if date_from:
+        rollups = rollups.filter(day__gte=date_from)
+    if date_to:
+        rollups = rollups.filter(day__lte=date_to)
+    if course:
+        rollups = rollups.filter(pay_course_id=course)
+    if lesson:
+        rollups = rollups.filter(pay_lesson_id=lesson)
+    if payment_method:
+        rollups = rollups.filter(payment_method=payment_method)
+
+    zero = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+    totals = rollups.aggregate(revenue=Coalesce(Sum('revenue'), zero), purchases=Coalesce(Sum('purchases'), 0))
+    series = (
+        rollups
+        .annotate(period=PERIODS[period])
+        .values('period')
+        .annotate(revenue=Sum('revenue'), purchases=Sum('purchases'))
+        .order_by('period')
+    )
+    watermark = RollupWatermark.objects.filter(name=PAYMENT_ROLLUP).values_list('value', flat=True).first()
+    return {'totals': totals, 'series': list(series), 'as_of': watermark}
@@ -6,7 +6,28 @@ from users.models import User, Payment
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
-        fields = ['id', 'session_id', 'payment_url', 'amount', 'user']
+        fields = ['id', 'session_id', 'link', 'amount', 'user']
+
+
+class PaymentStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ['id', 'status', 'session_id', 'link']
+
+
+class RevenueReportQuerySerializer(serializers.Serializer):
+    """Параметры отчета о выручке"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    course = serializers.IntegerField(required=False, min_value=1)
+    lesson = serializers.IntegerField(required=False, min_value=1)
+    payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError('date_from не может быть позже date_to.')
+        return attrs
 
 
 class UserSerializer(serializers.ModelSerializer):
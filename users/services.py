@@ -1,44 +1,201 @@
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
 import stripe
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
-stripe.api_key = settings.STRIPE_API_KEY  # Подключение API ключа
+logger = logging.getLogger(__name__)
 
 
-def create_product(name, description):
-    """Создает продукт в Stripe"""
-    try:
-        product = stripe.Product.create(name=name, description=description)
+class StripeService:
+    """
+    Клиент Stripe с постоянным пулом HTTP-соединений.
+
+    - таймауты на подключение и чтение (`STRIPE_CONNECT_TIMEOUT`, `STRIPE_READ_TIMEOUT`);
+    - ограниченное число повторов (`STRIPE_MAX_RETRIES`) с экспоненциальной задержкой и джиттером
+      для сетевых ошибок, 429 и 5xx; все попытки одного вызова идут с одним ключом идемпотентности;
+    - счетчики вызовов, ошибок, повторов и задержек по каждой операции (`stats()`).
+    """
+
+    def __init__(self, api_key=None, client=None, base_url=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, retry_backoff=None, pool_size=None):
+        self.max_retries = settings.STRIPE_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = settings.STRIPE_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.client = client or self._build_client(
+            api_key or settings.STRIPE_API_KEY,
+            base_url,
+            (connect_timeout or settings.STRIPE_CONNECT_TIMEOUT, read_timeout or settings.STRIPE_READ_TIMEOUT),
+            pool_size or settings.STRIPE_HTTP_POOL_SIZE,
+        )
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_client(api_key, base_url, timeout, pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return stripe.StripeClient(
+            api_key,
+            http_client=stripe.RequestsClient(session=session, timeout=timeout),
+            base_addresses={'api': base_url} if base_url else None,
+            max_network_retries=0,  # Повторы выполняет сам сервис
+        )
+
+    @staticmethod
+    def _is_retryable(error):
+        if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError)):
+            return True
+        return isinstance(error, stripe.APIError) and (error.http_status or 0) >= 500
+
+    def _record(self, operation, latency, retries, failed):
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                operation, {'calls': 0, 'errors': 0, 'retries': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+            )
+            metrics['calls'] += 1
+            metrics['errors'] += int(failed)
+            metrics['retries'] += retries
+            metrics['latency_total'] += latency
+            metrics['latency_max'] = max(metrics['latency_max'], latency)
+
+    def stats(self):
+        """Снимок счетчиков по операциям для мониторинга"""
+        with self._lock:
+            return {
+                operation: {**metrics, 'latency_avg': metrics['latency_total'] / metrics['calls']}
+                for operation, metrics in self._metrics.items()
+            }
+
+    def _call(self, operation, method, params, idempotency_key=None):
+        options = {'idempotency_key': idempotency_key or uuid.uuid4().hex}
+        started = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = method(params=params, options=options)
+                    break
+                except stripe.StripeError as e:
+                    if attempt >= self.max_retries or not self._is_retryable(e):
+                        raise
+                    time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+                    attempt += 1
+        except stripe.StripeError:
+            self._record(operation, time.monotonic() - started, attempt, failed=True)
+            raise
+        self._record(operation, time.monotonic() - started, attempt, failed=False)
+        return result
+
+    def create_product(self, name, description):
+        product = self._call('product', self.client.v1.products.create,
+                             {'name': name, 'description': description})
         return product.id
-    except stripe.error.StripeError as e:
-        print(f'Ошибка при создании продукта {e}')
+
+    def create_price(self, amount, product_id):
+        price = self._call('price', self.client.v1.prices.create,
+                           {'unit_amount': amount * 100, 'currency': 'pln', 'product': product_id})
+        return price.id
+
+    def create_checkout_session(self, price_id, idempotency_key=None):
+        session = self._call(
+            'checkout_session',
+            self.client.v1.checkout.sessions.create,
+            {
+                'payment_method_types': ['card'],
+                'line_items': [{'price': price_id, 'quantity': 1}],
+                'mode': 'payment',
+                'success_url': 'https://127.0.0.1:8000/',
+            },
+            idempotency_key=idempotency_key,
+        )
+        return session.id, session.url
+
+
+_stripe_service = None
+_stripe_service_lock = threading.Lock()
+
+
+def get_stripe_service():
+    """Общий для процесса экземпляр `StripeService` (создается при первом обращении)"""
+    global _stripe_service
+    if _stripe_service is None:
+        with _stripe_service_lock:
+            if _stripe_service is None:
+                _stripe_service = StripeService()
+    return _stripe_service
+
+
+def create_product(name, description, raise_errors=False):
+    """Создает продукт в Stripe (с `raise_errors` ошибка Stripe пробрасывается вместо возврата None)"""
+    try:
+        return get_stripe_service().create_product(name, description)
+    except stripe.StripeError as e:
+        logger.error('Ошибка при создании продукта: %s', e)
+        if raise_errors:
+            raise
         return None
 
 
-def create_price(amount, product_id):
+def create_price(amount, product_id, raise_errors=False):
     """Создает цену продукта"""
     try:
-        price = stripe.Price.create(
-            unit_amount=amount * 100,
-            currency='pln',
-            product=product_id
-        )
-        return price.id
-    except stripe.error.StripeError as e:
-        print(f'Ошибка при создании прайса {e}')
+        return get_stripe_service().create_price(amount, product_id)
+    except stripe.StripeError as e:
+        logger.error('Ошибка при создании прайса: %s', e)
+        if raise_errors:
+            raise
         return None
 
 
-def create_checkout_session(price_id):
-    """Создает сессию оплаты в Stripe"""
+def get_or_create_price(item, raise_errors=False):
+    """
+    Возвращает id цены в Stripe для курса или урока.
+
+    Продукт и цена создаются только при первой оплате и сохраняются в самом курсе/уроке.
+    Если стоимость `amount` изменилась, для существующего продукта создается новая цена.
+    """
+    if item.stripe_price_id and item.stripe_price_amount == item.amount:
+        return item.stripe_price_id
+
+    product_id = item.stripe_product_id or create_product(item.name, item.description, raise_errors)
+    if not product_id:
+        return None
     try:
-        session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=[{"price": price_id, "quantity": 1}],
-            mode="payment",
-            success_url="https://127.0.0.1:8000/",
-        )
-        return session.id, session.url
+        price_id = create_price(item.amount, product_id, raise_errors)
+    except stripe.StripeError:
+        # Продукт сохраняется, чтобы при повторе после ошибки цены не создавать второй
+        type(item).objects.filter(pk=item.pk).update(stripe_product_id=product_id)
+        item.stripe_product_id = product_id
+        raise
 
-    except stripe.error.StripeError as e:
-        print(f"Ошибка при создании сессии: {e}")
-    return None, None
+    # update() не меняет дату последнего обновления курса/урока
+    type(item).objects.filter(pk=item.pk).update(
+        stripe_product_id=product_id,
+        stripe_price_id=price_id,
+        stripe_price_amount=item.amount if price_id else None,
+    )
+    item.stripe_product_id, item.stripe_price_id = product_id, price_id
+    item.stripe_price_amount = item.amount if price_id else None
+    return price_id
+
+
+def create_checkout_session(price_id, idempotency_key=None, raise_errors=False):
+    """
+    Создает сессию оплаты в Stripe.
+
+    С `idempotency_key` повторный запрос (например, при перезапуске задачи) вернет уже созданную сессию.
+    """
+    try:
+        return get_stripe_service().create_checkout_session(price_id, idempotency_key=idempotency_key)
+    except stripe.StripeError as e:
+        logger.error('Ошибка при создании сессии: %s', e)
+        if raise_errors:
+            raise
+        return None, None
@@ -1,20 +1,89 @@
+import logging
+
+import stripe
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from datetime import timedelta
+
+from users import reports
+from users.models import Payment
+from users.services import create_checkout_session, get_or_create_price
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def deactivate_inactive_users():
     """
-    Деактивирует пользователей, которые не заходили в систему больше месяца.
+    Деактивирует пользователей, которые не заходили в систему дольше `USER_INACTIVITY_PERIOD`.
+
+    Обновление выполняется пачками по `USER_DEACTIVATION_BATCH_SIZE` пользователей (по возрастанию id),
+    результат задачи содержит количество и id деактивированных пользователей.
+    """
+    threshold = timezone.now() - settings.USER_INACTIVITY_PERIOD
+    inactive_users = User.objects.filter(last_login__lte=threshold, is_active=True)
+    batch_size = settings.USER_DEACTIVATION_BATCH_SIZE
+
+    deactivated_ids = []
+    last_id = 0
+    while True:
+        ids = list(inactive_users.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        # Условие неактивности проверяется повторно: пользователь мог войти после выборки id
+        updated = inactive_users.filter(pk__in=ids).update(is_active=False)
+        if updated < len(ids):
+            # Часть пачки осталась активной: в результат попадают только действительно деактивированные
+            ids = list(User.objects.filter(pk__in=ids, is_active=False, last_login__lte=threshold)
+                       .order_by('pk').values_list('pk', flat=True))
+        deactivated_ids.extend(ids)
+
+    logger.info('Деактивировано пользователей из-за неактивности: %s', len(deactivated_ids))
+    return {'count': len(deactivated_ids), 'ids': deactivated_ids}
+
+
+@shared_task(bind=True, autoretry_for=(stripe.StripeError,), retry_backoff=True,
+             max_retries=settings.PAYMENT_SESSION_MAX_RETRIES)
+def create_payment_session(self, payment_id):
     """
-    one_month_ago = timezone.now() - timedelta(minutes=5)
-    inactive_users = User.objects.filter(last_login__lte=one_month_ago, is_active=True)
+    Создает сессию оплаты в Stripe для платежа в статусе `pending`.
 
-    for user in inactive_users:
-        user.is_active = False
-        user.save()
-        print(f"Пользователь {user.email} был деактивирован из-за неактивности.")
+    Ключ идемпотентности привязан к платежу, поэтому повторный запуск задачи не создаст вторую сессию.
+    Ошибки Stripe повторяются с экспоненциальной задержкой; статус `failed` ставится только
+    после исчерпания `PAYMENT_SESSION_MAX_RETRIES` повторов.
+    """
+    payment = Payment.objects.select_related('pay_course', 'pay_lesson').filter(
+        id=payment_id, status='pending'
+    ).first()
+    if payment is None:
+        return None
+
+    session_id, session_url = None, None
+    try:
+        price_id = get_or_create_price(payment.pay_course or payment.pay_lesson, raise_errors=True)
+        if price_id:
+            session_id, session_url = create_checkout_session(
+                price_id, idempotency_key=f'payment-session-{payment.id}', raise_errors=True
+            )
+    except stripe.StripeError:
+        if self.request.retries < self.max_retries:
+            raise
+        logger.error('Сессия оплаты для платежа %s не создана после %s повторов', payment.id, self.max_retries)
+
+    status = 'ready' if session_id else 'failed'
+    # update() не заполняет auto_now: дата изменения нужна для пересчета сводной таблицы
+    Payment.objects.filter(id=payment.id).update(status=status, session_id=session_id, link=session_url,
+                                                 updated_at=timezone.now())
+    return status
+
+
+@shared_task
+def refresh_payment_rollups():
+    """
+    Обновляет сводную таблицу выручки по платежам, появившимся после прошлого запуска.
+    """
+    return reports.refresh_payment_rollups()
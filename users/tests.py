@@ -1,3 +1,620 @@
-from django.test import TestCase
+import csv
+import inspect
+import io
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import stripe
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import QuerySet, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config import celery_app
+from loadtest.fakes import FakeStripeClient
+from materials.cache import subscribed_course_ids
+from materials.models import Course, Lesson
+from subscription.models import Subscription
+from users.management.commands.bulk_loaddata import iter_json_objects
+from users.models import Payment, PaymentDailyRollup, RollupWatermark
+from users.services import StripeService
+from users.tasks import create_payment_session, deactivate_inactive_users, refresh_payment_rollups
+
+User = get_user_model()
+
+
+class StubStripeHandler(BaseHTTPRequestHandler):
+    """Локальный HTTP-сервер вместо api.stripe.com: отвечает по очереди из `responses`"""
+    responses = []
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'] or 0))
+        self.requests.append((self.path, dict(self.headers), body))
+        status_code, delay = self.responses.pop(0) if self.responses else (200, 0)
+        time.sleep(delay)
+        payload = {'id': 'prod_stub', 'object': 'product'} if status_code == 200 else \
+            {'error': {'type': 'api_error', 'message': 'stub failure'}}
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DeactivateInactiveUsersTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.inactive = [
+            User.objects.create_user(email=f'inactive{i}@fob.ru', password='Poma2404',
+                                     last_login=now - timedelta(days=40))
+            for i in range(3)
+        ]
+        self.active = User.objects.create_user(email='active@fob.ru', password='Poma2404',
+                                               last_login=now - timedelta(days=1))
+        self.never_logged_in = User.objects.create_user(email='new@fob.ru', password='Poma2404')
+
+    @override_settings(USER_DEACTIVATION_BATCH_SIZE=2)
+    def test_deactivate_inactive_users(self):
+        """Неактивные пользователи деактивируются пачками, id возвращаются в результате"""
+        with self.assertNumQueries(5):  # две пачки: выборка id и UPDATE, затем пустая выборка
+            result = deactivate_inactive_users()
+
+        self.assertEqual(result, {'count': 3, 'ids': [user.id for user in self.inactive]})
+        self.assertFalse(User.objects.filter(id__in=result['ids'], is_active=True).exists())
+        self.assertTrue(User.objects.get(id=self.active.id).is_active)
+        self.assertTrue(User.objects.get(id=self.never_logged_in.id).is_active)
+
+    def test_user_logged_in_after_selection_stays_active(self):
+        """Пользователь, вошедший между выборкой id и UPDATE, не деактивируется"""
+        returning = self.inactive[0]
+        update = QuerySet.update
+
+        def login_then_update(queryset, **kwargs):
+            update(User.objects.filter(pk=returning.pk), last_login=timezone.now())
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=login_then_update):
+            result = deactivate_inactive_users()
+
+        self.assertEqual(result['ids'], [user.id for user in self.inactive[1:]])
+        self.assertTrue(User.objects.get(id=returning.id).is_active)
+
+    @override_settings(USER_INACTIVITY_PERIOD=timedelta(days=60))
+    def test_inactivity_period_from_settings(self):
+        """Порог неактивности берется из настроек"""
+        result = deactivate_inactive_users()
+
+        self.assertEqual(result, {'count': 0, 'ids': []})
+
+
+class PaymentCreateTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Advanced Django', description='Django', amount=2000)
+        self.lesson = Lesson.objects.create(name='Lesson 1', course=self.course, amount=500)
+
+        self.stripe = FakeStripeClient()
+        patcher = mock.patch('users.services.get_stripe_service', return_value=StripeService(client=self.stripe))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pay(self, **data):
+        return self.client.post(reverse('users:payment'), data={'payment_method': 'transfer', **data})
+
+    def test_product_and_price_are_reused(self):
+        """Продукт и цена в Stripe создаются один раз, дальше создается только сессия"""
+        first = self.pay(pay_course=self.course.id)
+        second = self.pay(pay_course=self.course.id)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stripe.calls, Counter(prod=1, price=1, cs=2))
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.stripe_product_id, self.course.stripe_price_id), ('prod_1', 'price_1'))
+        self.assertEqual(Payment.objects.filter(pay_course=self.course).count(), 2)
+
+    def test_new_price_when_amount_changes(self):
+        """При изменении стоимости создается новая цена для того же продукта"""
+        self.pay(pay_lesson=self.lesson.id)
+        self.lesson.refresh_from_db()
+        self.lesson.amount = 700
+        self.lesson.save()
+        self.pay(pay_lesson=self.lesson.id)
+
+        self.assertEqual(self.stripe.calls, Counter(prod=1, price=2, cs=2))
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.stripe_price_id, 'price_2')
+        self.assertEqual(self.lesson.stripe_price_amount, 700)
+
+    @override_settings(PAYMENT_ASYNC_CHECKOUT=True)
+    def test_async_checkout(self):
+        """Платеж создается сразу в статусе pending, сессия создается задачей Celery"""
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', always_eager)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.pay(pay_course=self.course.id)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(self.stripe.calls, Counter())
+
+        status_url = response.data['status_url']
+        self.assertEqual(self.client.get(status_url).data['status'], 'pending')
+
+        for callback in callbacks:
+            callback()
+
+        payment = self.client.get(status_url).data
+        self.assertEqual(payment['status'], 'ready')
+        self.assertEqual(payment['session_id'], 'cs_1')
+        self.assertEqual(self.stripe.options['cs']['idempotency_key'], f'payment-session-{response.data["id"]}')
+        self.assertEqual(self.stripe.calls, Counter(prod=1, price=1, cs=1))
+
+    def test_payment_session_retried_after_stripe_error(self):
+        """Ошибка Stripe повторяется задачей с тем же ключом идемпотентности"""
+        payment = Payment.objects.create(user=self.user, pay_course=self.course, status='pending')
+        create = self.stripe.v1.checkout.sessions.create
+        self.stripe.v1.checkout.sessions.create = mock.Mock(
+            side_effect=[stripe.APIError('stripe is down'), create(params={}, options={})]
+        )
+
+        result = create_payment_session.apply(args=[payment.id]).get()
+
+        self.assertEqual(result, 'ready')
+        keys = [call.kwargs['options']['idempotency_key'] for call in self.stripe.v1.checkout.sessions.create.mock_calls]
+        self.assertEqual(keys, [f'payment-session-{payment.id}'] * 2)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'ready')
+
+    def test_payment_session_failed_after_retries(self):
+        """Статус failed ставится только после исчерпания повторов"""
+        payment = Payment.objects.create(user=self.user, pay_course=self.course, status='pending')
+        self.stripe.v1.checkout.sessions.create = mock.Mock(side_effect=stripe.APIError('stripe is down'))
+
+        result = create_payment_session.apply(args=[payment.id]).get()
+
+        self.assertEqual(result, 'failed')
+        self.assertEqual(self.stripe.v1.checkout.sessions.create.call_count, settings.PAYMENT_SESSION_MAX_RETRIES + 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+
+    def test_payment_status_of_other_user(self):
+        """Статус чужого платежа недоступен"""
+        other = User.objects.create_user(email='other@fob.ru', password='Poma2404')
+        payment = Payment.objects.create(user=other, pay_course=self.course, status='pending')
+
+        response = self.client.get(reverse('users:payment-status', kwargs={'pk': payment.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PaymentListTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Advanced Django')
+        self.payments = [Payment.objects.create(user=self.user, pay_course=self.course) for _ in range(5)]
+        other = User.objects.create_user(email='other@fob.ru', password='Poma2404')
+        Payment.objects.create(user=other, pay_course=self.course)
+
+    def test_cursor_pagination(self):
+        """История платежей выдается от новых к старым без COUNT(*)"""
+        url = reverse('users:payments_details-list') + '?limit=2'
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertNotIn('count', response.data)
+
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(payment['id'] for payment in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(ids, [payment.id for payment in reversed(self.payments)])
+
+    def test_offset_mode(self):
+        """LimitOffset-режим не считает общее количество платежей"""
+        url = reverse('users:payments_details-list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'limit': 2, 'offset': 4})
+
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual([payment['id'] for payment in response.data['results']], [self.payments[0].id])
+
+        response = self.client.get(url, {'limit': 2, 'offset': 0})
+        self.assertIsNotNone(response.data['next'])
+
+    def test_filter_by_ids(self):
+        """Фильтр по курсу и уроку не загружает каталог и не проверяет id отдельным запросом"""
+        lesson = Lesson.objects.create(name='Lesson 1', course=self.course)
+        lesson_payment = Payment.objects.create(user=self.user, pay_lesson=lesson)
+        other_course = Course.objects.create(name='Python')
+        url = reverse('users:payments_details-list')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'pay_lesson': lesson.id})
+        self.assertEqual([payment['id'] for payment in response.data['results']], [lesson_payment.id])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'pay_course': f'{self.course.id},{other_course.id}', 'limit': 10})
+        self.assertEqual(len(response.data['results']), 5)
+
+        # Курс без платежей пользователя и несуществующий курс дают пустой список, а не ошибку
+        for course_id in (other_course.id, other_course.id + 100):
+            response = self.client.get(url, {'pay_course': course_id})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['results'], [])
+
+        response = self.client.get(url, {'pay_course': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_date_and_amount(self):
+        """Фильтры по диапазону даты оплаты и суммы"""
+        old, cheap, expensive = self.payments[:3]
+        Payment.objects.filter(pk=old.pk).update(data_pay=timezone.now() - timedelta(days=10))
+        Payment.objects.filter(pk=cheap.pk).update(amount=50)
+        Payment.objects.filter(pk=expensive.pk).update(amount=5000)
+        url = reverse('users:payments_details-list')
+
+        yesterday = (timezone.now() - timedelta(days=1)).date().isoformat()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'data_pay_after': yesterday, 'limit': 10})
+        self.assertNotIn(old.id, [payment['id'] for payment in response.data['results']])
+        self.assertEqual(len(response.data['results']), 4)
+
+        response = self.client.get(url, {'data_pay_before': yesterday})
+        self.assertEqual([payment['id'] for payment in response.data['results']], [old.id])
+
+        response = self.client.get(url, {'amount_min': 10, 'amount_max': 100})
+        self.assertEqual([payment['id'] for payment in response.data['results']], [cheap.id])
+
+        response = self.client.get(url, {'amount_min': 1000})
+        self.assertEqual([payment['id'] for payment in response.data['results']], [expensive.id])
+
+
+class StripeServiceTestCase(TestCase):
+    def setUp(self):
+        StubStripeHandler.responses = []
+        StubStripeHandler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubStripeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def service(self, **kwargs):
+        return StripeService(api_key='sk_test_stub', base_url=f'http://127.0.0.1:{self.server.server_port}',
+                             retry_backoff=0.01, **kwargs)
+
+    def test_retry_on_server_error(self):
+        """5xx повторяется с тем же ключом идемпотентности, повтор попадает в метрики"""
+        StubStripeHandler.responses = [(500, 0)]
+        service = self.service(max_retries=2)
+
+        self.assertEqual(service.create_product('Course', 'Description'), 'prod_stub')
+
+        keys = {headers['Idempotency-Key'] for _, headers, _ in StubStripeHandler.requests}
+        self.assertEqual(len(StubStripeHandler.requests), 2)
+        self.assertEqual(len(keys), 1)
+        stats = service.stats()['product']
+        self.assertEqual((stats['calls'], stats['errors'], stats['retries']), (1, 0, 1))
+
+    def test_read_timeout(self):
+        """Зависший ответ прерывается по таймауту чтения, число попыток ограничено"""
+        StubStripeHandler.responses = [(200, 1), (200, 1)]
+        service = self.service(read_timeout=0.2, max_retries=1)
+
+        with self.assertRaises(stripe.APIConnectionError):
+            service.create_product('Course', 'Description')
+
+        stats = service.stats()['product']
+        self.assertEqual((stats['calls'], stats['errors'], stats['retries']), (1, 1, 1))
+        self.assertLess(stats['latency_max'], 1)
+
+    def test_client_error_is_not_retried(self):
+        """Ошибки 4xx не повторяются"""
+        StubStripeHandler.responses = [(400, 0)]
+        service = self.service(max_retries=2)
+
+        with self.assertRaises(stripe.InvalidRequestError):
+            service.create_product('Course', 'Description')
+
+        self.assertEqual(len(StubStripeHandler.requests), 1)
+
+
+class PaymentRollupTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@fob.ru', password='Poma2404', is_staff=True)
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.course = Course.objects.create(name='Advanced Django')
+        self.lesson = Lesson.objects.create(name='Lesson 1', course=self.course)
+        self.today = timezone.now().date()
+
+    def pay(self, amount, days_ago=0, **kwargs):
+        kwargs.setdefault('pay_course', self.course)
+        payment = Payment.objects.create(user=self.user, amount=amount, **kwargs)
+        # data_pay заполняется автоматически (auto_now_add), дата в прошлом задается через update()
+        Payment.objects.filter(pk=payment.pk).update(data_pay=timezone.now() - timedelta(days=days_ago))
+        return payment
+
+    def test_refresh_incremental(self):
+        """Задача пересчитывает только новые дни и не учитывает платежи повторно"""
+        self.pay(100, days_ago=40)
+        self.pay(200, days_ago=1, payment_method='transfer')
+        self.pay(300, days_ago=1, status='failed')
+
+        refresh_payment_rollups()
+        self.assertEqual(PaymentDailyRollup.objects.count(), 2)
+        self.assertEqual(PaymentDailyRollup.objects.aggregate(total=Sum('revenue'))['total'], 300)
+
+        self.pay(50, pay_course=None, pay_lesson=self.lesson)
+        refresh_payment_rollups()
+
+        self.assertEqual(PaymentDailyRollup.objects.aggregate(total=Sum('revenue'))['total'], 350)
+        self.assertEqual(PaymentDailyRollup.objects.filter(day=self.today, pay_lesson=self.lesson).get().purchases, 1)
+
+    def test_refresh_changed_payments(self):
+        """Пересохраненный платеж не учитывается дважды, смена статуса пересчитывает старый день"""
+        old = self.pay(100, days_ago=10)
+        pending = self.pay(200, days_ago=5, status='pending')
+        refresh_payment_rollups()
+        self.assertEqual(list(PaymentDailyRollup.objects.values_list('day', 'revenue')),
+                         [(self.today - timedelta(days=10), 100)])
+
+        old.refresh_from_db()
+        old.save()
+        pending.refresh_from_db()
+        pending.status = 'ready'
+        pending.save()
+        refresh_payment_rollups()
+        self.assertEqual(list(PaymentDailyRollup.objects.order_by('day').values_list('day', 'revenue')),
+                         [(self.today - timedelta(days=10), 100), (self.today - timedelta(days=5), 200)])
+
+        Payment.objects.filter(pk=old.pk).update(status='failed', updated_at=timezone.now())
+        result = refresh_payment_rollups()
+        self.assertEqual(list(PaymentDailyRollup.objects.values_list('revenue', flat=True)), [200])
+        self.assertEqual(result['watermark'], Payment.objects.get(pk=old.pk).updated_at.isoformat())
+
+    def test_backfill_command(self):
+        """Команда пересобирает таблицу частями и ставит отметку для инкрементальной задачи"""
+        self.pay(100, days_ago=3)
+        self.pay(100, days_ago=3)
+        self.pay(100)
+        PaymentDailyRollup.objects.create(day=self.today, payment_method='cash', revenue=999, purchases=9)
+
+        out = io.StringIO()
+        call_command('backfill_payment_rollups', chunk_days=2, stdout=out)
+
+        self.assertEqual(
+            list(PaymentDailyRollup.objects.order_by('day').values_list('revenue', 'purchases')),
+            [(200, 2), (100, 1)],
+        )
+        self.assertEqual(out.getvalue().count(' - '), 2)
+        self.assertIsNotNone(RollupWatermark.objects.get(name='payment_daily').value)
+
+    def test_revenue_endpoint(self):
+        """Отчет для администратора строится по сводной таблице тремя запросами"""
+        self.pay(100, days_ago=40)
+        self.pay(200)
+        self.pay(300, pay_course=None, pay_lesson=self.lesson)
+        refresh_payment_rollups()
+        url = reverse('users:payment-revenue')
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        # итоги, временной ряд, отметка
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'course': self.course.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals'], {'revenue': 300, 'purchases': 2})
+        self.assertEqual([point['revenue'] for point in response.data['series']], [100, 200])
+        self.assertIsNotNone(response.data['as_of'])
+
+        response = self.client.get(url, {'period': 'month', 'date_from': self.today.isoformat()})
+        self.assertEqual(response.data['totals'], {'revenue': 500, 'purchases': 2})
+        self.assertEqual(len(response.data['series']), 1)
+
+        response = self.client.get(url, {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PaymentExportTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@fob.ru', password='Poma2404', is_staff=True)
+        self.user = User.objects.create_user(email='alina@fob.ru', password='Poma2404')
+        self.course = Course.objects.create(name='Advanced Django')
+        self.payments = [Payment.objects.create(user=self.user, pay_course=self.course, amount=number * 100)
+                         for number in range(1, 6)]
+        self.url = reverse('users:payment-export')
+        self.client.force_authenticate(user=self.admin)
+
+    @staticmethod
+    def content(response):
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_csv_export(self):
+        """CSV отдается потоком: заголовок уходит до запроса к базе"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('filename="payments.csv"', response['Content-Disposition'])
+
+        chunks = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            header = next(chunks)
+        self.assertTrue(header.startswith(b'id,user_id,user__email,data_pay'))
+
+        rows = list(csv.DictReader(io.StringIO(header.decode() + b''.join(chunks).decode())))
+        self.assertEqual([int(row['id']) for row in rows], [payment.id for payment in self.payments])
+        self.assertEqual(rows[0]['user__email'], 'alina@fob.ru')
+
+    def test_ndjson_export_with_filter(self):
+        """NDJSON: по одному JSON-объекту на строку, фильтры PaymentFilter применяются"""
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'amount_min': 300})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [payment.id for payment in self.payments[2:]])
+        self.assertEqual(rows[0]['amount'], '300.00')
+
+    def test_export_errors(self):
+        """Неизвестный формат и некорректный фильтр отклоняются, обычному пользователю выгрузка недоступна"""
+        self.assertEqual(self.client.get(self.url, {'export_format': 'xml'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'pay_course': 'abc'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BulkLoadDataTestCase(TestCase):
+    fixtures_dir = settings.BASE_DIR / 'fixtures'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, records, jsonl=False):
+        path = Path(self.tmp.name) / name
+        with open(path, 'w', encoding='utf-8') as file:
+            if jsonl:
+                file.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            else:
+                json.dump(records, file, ensure_ascii=False, indent=2)
+        return path
+
+    def test_iter_json_objects(self):
+        """Разбор не зависит от того, где граница буфера чтения разрезала объект"""
+        records = [{'model': 'materials.course', 'pk': pk, 'fields': {'name': '[x], ' * pk}} for pk in range(1, 20)]
+        for text in (json.dumps(records, indent=2), '\n'.join(json.dumps(record) for record in records)):
+            self.assertEqual(list(iter_json_objects(io.StringIO(text), read_size=5)), records)
+
+    def test_load_repo_fixtures(self):
+        """Все фикстуры проекта (каталог по умолчанию) загружаются в порядке внешних ключей"""
+        out = io.StringIO()
+        call_command('bulk_loaddata', batch_size=2, stdout=out)
+
+        expected = Counter()
+        for path in self.fixtures_dir.glob('*.json'):
+            expected.update(record['model'] for record in json.loads(path.read_text(encoding='utf-8')))
+        self.assertEqual(User.objects.count(), expected['users.user'])
+        self.assertEqual(Course.objects.count(), expected['materials.course'])
+        self.assertEqual(Lesson.objects.count(), expected['materials.lesson'])
+        self.assertEqual(Subscription.objects.count(), expected['subscription.subscription'])
+        self.assertEqual(Payment.objects.count(), expected['users.payment'])
+
+        # Счетчики, которые обычно поддерживают сигналы, пересчитаны после загрузки
+        course = Course.objects.get(pk=1)
+        self.assertEqual(course.lesson_count, Lesson.objects.filter(course=course).count())
+        self.assertEqual(course.subscriber_count, Subscription.objects.filter(course=course).count())
+        # Дата из фикстуры не заменена текущим временем (auto_now_add)
+        self.assertEqual(Subscription.objects.get(pk=1).created_at.date(), date(2025, 2, 1))
+        self.assertEqual(Payment.objects.get(pk=1).data_pay, datetime(2025, 2, 12, 10, 0))
+        self.assertIn('Загружено объектов', out.getvalue())
+
+    def test_load_conflict(self):
+        """Повторная загрузка без --ignore-conflicts сообщает файл и пачку, с --ignore-conflicts проходит"""
+        users = self.fixtures_dir / 'users_fixture.json'
+        call_command('bulk_loaddata', users, stdout=io.StringIO())
+
+        with self.assertRaisesMessage(CommandError, f'{users}: пачка 1 (users.User'):
+            call_command('bulk_loaddata', users, stdout=io.StringIO())
+
+        call_command('bulk_loaddata', users, ignore_conflicts=True, stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), len(json.loads(users.read_text(encoding='utf-8'))))
+
+    def test_load_jsonl(self):
+        """JSONL загружается пачками, последовательности id сдвигаются за загруженные значения"""
+        payments = self.write('payments.jsonl', [
+            {'model': 'users.payment', 'pk': pk,
+             'fields': {'user': 10, 'pay_course': 20, 'amount': '100.00', 'data_pay': '2025-02-12T10:00:00'}}
+            for pk in range(1, 6)
+        ], jsonl=True)
+        courses = self.write('courses.json', [{'model': 'materials.course', 'pk': 20, 'fields': {'name': 'Django'}}])
+        users = self.write('users.jsonl', [{'model': 'users.user', 'pk': 10, 'fields': {'email': 'a@fob.ru'}}],
+                           jsonl=True)
+
+        call_command('bulk_loaddata', payments, courses, users, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(Payment.objects.filter(user_id=10, pay_course_id=20).count(), 5)
+        self.assertEqual(Payment.objects.get(pk=1).data_pay, datetime(2025, 2, 12, 10, 0))
+        self.assertGreater(Course.objects.create(name='Python').pk, 20)
+
+        with self.assertRaises(CommandError):
+            call_command('bulk_loaddata', self.write('bad.json', [{'model': 'users.paymentdetails', 'fields': {}}]),
+                         stdout=io.StringIO())
+
+
+    def test_load_subscriptions_invalidates_user_cache(self):
+        """После загрузки подписок закэшированный список подписок пользователя не устаревает"""
+        user = User.objects.create(email='a@fob.ru')
+        course = Course.objects.create(name='Django')
+        self.assertEqual(subscribed_course_ids(user), set())
+
+        subscriptions = self.write('subscriptions.json', [
+            {'model': 'subscription.subscription', 'fields': {'user': user.pk, 'course': course.pk}}
+        ])
+        call_command('bulk_loaddata', subscriptions, stdout=io.StringIO())
+
+        self.assertEqual(subscribed_course_ids(user), {course.pk})
+
+    def test_raw_insert_signature(self):
+        """users.bulk переопределяет внутренний QuerySet._insert: параметр raw должен сохраниться"""
+        self.assertIn('raw', inspect.signature(QuerySet._insert).parameters)
+
+
+class SyntheticDataTestCase(TestCase):
+    def generate(self, **options):
+        out = io.StringIO()
+        call_command('generate_synthetic_data', users=30, courses=5, lessons_per_course=3, subscriptions=40,
+                     payments=50, seed=1, batch_size=10, stdout=out, **options)
+        return out.getvalue()
+
+    def test_generate_synthetic_data(self):
+        """Генератор создает связанные данные с неравномерной популярностью и пересчитанными счетчиками"""
+        output = self.generate()
+
+        self.assertEqual(User.objects.filter(email__startswith='load-').count(), 30)
+        self.assertEqual(Course.objects.count(), 5)
+        self.assertEqual(Subscription.objects.count(), 40)
+        self.assertEqual(Payment.objects.count(), 50)
+        self.assertFalse(Payment.objects.filter(pay_course=None, pay_lesson=None).exists())
+        self.assertIn('Создано: пользователей 30', output)
+
+        counts = sorted(Course.objects.values_list('subscriber_count', flat=True), reverse=True)
+        self.assertGreater(counts[0], counts[-1])
+        for course in Course.objects.all():
+            self.assertEqual(course.lesson_count, course.lessons.count())
+            self.assertEqual(course.subscriber_count, course.subscribers.count())
+        # Даты распределены по прошлому, а не заменены текущим временем (auto_now)
+        self.assertLess(Payment.objects.order_by('data_pay').first().data_pay, timezone.now() - timedelta(days=1))
+
+        with self.assertRaises(CommandError):
+            self.generate()
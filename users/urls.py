@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 
 from users.apps import UsersConfig
-from users.views import UserViewSet, RegisterView, PaymentViewSet, PaymentCreateAPIView
+from users.views import UserViewSet, RegisterView, PaymentViewSet, PaymentCreateAPIView, PaymentStatusAPIView, \
+    StripeStatsAPIView, RevenueReportAPIView, PaymentExportAPIView
 
 app_name = UsersConfig.name
 
@@ -24,5 +25,13 @@ urlpatterns = [
                   path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
                   # Эндпоинт для Strip-сессии оплаты
-                  path('payment/', PaymentCreateAPIView.as_view(), name='payment')
+                  path('payment/', PaymentCreateAPIView.as_view(), name='payment'),
+                  # Эндпоинт для проверки статуса сессии оплаты
+                  path('payment/<int:pk>/status/', PaymentStatusAPIView.as_view(), name='payment-status'),
+                  # Метрики обращений к Stripe
+                  path('stripe/stats/', StripeStatsAPIView.as_view(), name='stripe-stats'),
+                  # Отчет о выручке по сводной таблице
+                  path('payments/revenue/', RevenueReportAPIView.as_view(), name='payment-revenue'),
+                  # Потоковая выгрузка платежей
+                  path('payments/export/', PaymentExportAPIView.as_view(), name='payment-export'),
               ] + router.urls
@@ -1,18 +1,26 @@
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django_filters import FilterSet, ModelChoiceFilter, CharFilter
+from django.urls import reverse
+from django_filters import BaseInFilter, CharFilter, DateFromToRangeFilter, FilterSet, NumberFilter, RangeFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter
-from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.generics import CreateAPIView, RetrieveAPIView
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from config.exports import ExportQuerySerializer, stream_export
 from materials.models import Course, Lesson
 from users.models import User, Payment
-from users.paginators import UsersPagination
-from users.serializers import UserSerializer, PaymentSerializer
-from users.services import create_product, create_price, create_checkout_session
+from users.paginators import UsersPagination, PaymentPagination
+from users.reports import revenue_report
+from users.serializers import UserSerializer, PaymentSerializer, PaymentStatusSerializer, \
+    RevenueReportQuerySerializer
+from users.services import get_or_create_price, create_checkout_session, get_stripe_service
+from users.tasks import create_payment_session
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -40,31 +48,45 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 # Настройка фильтров
+class NumberInFilter(BaseInFilter, NumberFilter):
+    """Фильтр по одному или нескольким числовым id через запятую"""
+
+
 class PaymentFilter(FilterSet):
     """
     Класс фильтра для модели `Payment`.
 
-    Фильтрует данные о платежах по курсу, уроку и способу оплаты.
+    Фильтрует данные о платежах по курсу, уроку, способу оплаты, дате и сумме.
+    Курс и урок фильтруются по id без загрузки каталога: id, которых нет среди
+    платежей пользователя, просто дают пустой результат в том же запросе.
     """
-    pay_course = ModelChoiceFilter(
-        queryset=Course.objects.all(),
-        field_name='pay_course',
-        label='Фильтр по курсу'
+    pay_course = NumberInFilter(
+        field_name='pay_course_id',
+        label='Фильтр по курсу (id через запятую)'
     )
-    pay_lesson = ModelChoiceFilter(
-        queryset=Lesson.objects.all(),
-        field_name='pay_lesson',
-        label='Фильтр по уроку'
+    pay_lesson = NumberInFilter(
+        field_name='pay_lesson_id',
+        label='Фильтр по уроку (id через запятую)'
     )
     payment_method = CharFilter(
         lookup_expr='iexact',  # Способ поиска для фильтров.
         field_name='payment_method',
         label='Фильтр по способу оплаты'
     )
+    # data_pay_after / data_pay_before, индекс (user, data_pay, id)
+    data_pay = DateFromToRangeFilter(
+        field_name='data_pay',
+        label='Фильтр по дате оплаты'
+    )
+    # amount_min / amount_max, индекс (user, amount)
+    amount = RangeFilter(
+        field_name='amount',
+        label='Фильтр по сумме оплаты'
+    )
 
     class Meta:
         model = Payment
-        fields = ['pay_course', 'pay_lesson', 'payment_method', ]
+        fields = ['pay_course', 'pay_lesson', 'payment_method', 'data_pay', 'amount']
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -80,9 +102,11 @@ class PaymentViewSet(viewsets.ModelViewSet):
     # Настройка фильтрации и сортировки
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = PaymentFilter
-    ordering_fields = ['data_pay']  # Поле для сортировки
-    ordering = ['-data_pay']  # По умолчанию сортировка по дате оплаты(по убыванию)
+    ordering_fields = ['data_pay', 'id']  # Поля для сортировки
+    ordering = ['-data_pay', '-id']  # По умолчанию сортировка по дате оплаты(по убыванию)
     permission_classes = [IsAuthenticated]
+    # Пагинация без COUNT(*) по (data_pay, id)
+    pagination_class = PaymentPagination
 
     def get_queryset(self):
         # показывать только для текущего пользователя
@@ -111,9 +135,11 @@ class PaymentCreateAPIView(CreateAPIView):
         if not payment_method:
             return Response({"error": "Не указан метод оплаты"}, status=400)
 
-        # Создаём продукт и цену в Stripe
-        stripe_product_id = create_product(product.name, product.description)
-        stripe_price_id = create_price(product.amount, stripe_product_id)
+        if settings.PAYMENT_ASYNC_CHECKOUT:
+            return self.create_pending_payment(user, product, payment_method)
+
+        # Получаем цену в Stripe (продукт и цена создаются только при первой оплате)
+        stripe_price_id = get_or_create_price(product)
 
         # Если не удалось создать прайс, возвращаем ошибку
         if not stripe_price_id:
@@ -148,6 +174,86 @@ class PaymentCreateAPIView(CreateAPIView):
             status=201
         )
 
+    def create_pending_payment(self, user, product, payment_method):
+        """
+        Сохраняет платеж в статусе `pending` и создает сессию оплаты в фоновой задаче.
+
+        Клиент получает ссылку на эндпоинт статуса и опрашивает его, пока сессия не будет готова.
+        """
+        payment = Payment.objects.create(
+            user=user,
+            pay_course=product if isinstance(product, Course) else None,
+            pay_lesson=product if isinstance(product, Lesson) else None,
+            amount=product.amount,
+            payment_method=payment_method,
+            status='pending',
+        )
+        transaction.on_commit(lambda: create_payment_session.delay(payment.id))
+
+        return Response(
+            {
+                "id": payment.id,
+                "status": payment.status,
+                "amount": payment.amount,
+                "user": user.email,
+                "status_url": reverse('users:payment-status', kwargs={'pk': payment.id}),
+            },
+            status=202
+        )
+
+
+class PaymentStatusAPIView(RetrieveAPIView):
+    """
+    Статус создания сессии оплаты для платежа текущего пользователя.
+    """
+    serializer_class = PaymentStatusSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Payment.objects.filter(user=self.request.user).only('id', 'status', 'session_id', 'link')
+
+
+class StripeStatsAPIView(APIView):
+    """
+    Счетчики вызовов Stripe (количество, ошибки, повторы, задержки) текущего процесса.
+    Доступ только для администраторов.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stripe_service().stats())
+
+
+class RevenueReportAPIView(APIView):
+    """
+    Итоги и временной ряд выручки (по дням, неделям или месяцам) из сводной таблицы.
+    Доступ только для администраторов.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = RevenueReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(revenue_report(**serializer.validated_data))
+
+
+class PaymentExportAPIView(APIView):
+    """
+    Потоковая выгрузка всех платежей в CSV или NDJSON (`?export_format=`) с фильтрами `PaymentFilter`.
+    Доступ только для администраторов.
+    """
+    permission_classes = [IsAdminUser]
+    fields = ['id', 'user_id', 'user__email', 'data_pay', 'pay_course_id', 'pay_lesson_id', 'amount',
+              'payment_method', 'status', 'session_id']
+
+    def get(self, request):
+        serializer = ExportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        payments = PaymentFilter(request.query_params, queryset=Payment.objects.order_by('id'))
+        if not payments.is_valid():
+            raise ValidationError(payments.errors)
+        return stream_export(payments.qs, self.fields, serializer.validated_data['export_format'], 'payments')
+
 
 class RegisterView(APIView):
     """